@@ -1,7 +1,24 @@
 import os
 import calendar
 import uuid
+import hmac
+import json
+import hashlib
+import secrets
+import threading
+import tempfile
+import time
+import warnings
+import click
+import jinja2
+import contextlib
+import sys
+import itertools
+import random
+import functools
 import psycopg2
+import psycopg2.extras
+import psycopg2.errors
 import requests
 import asyncio
 import httpx
@@ -12,12 +29,16 @@ from bs4 import BeautifulSoup
 from flask import jsonify
 from dotenv import load_dotenv
 from datetime import datetime, date, timedelta
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, Request, render_template, request, jsonify, redirect, url_for, g
 from xml.sax.saxutils import escape
+from urllib.parse import urlsplit, urlunsplit, urlencode, quote
 from flask import Response
 from bs4 import BeautifulSoup
 from apscheduler.schedulers.background import BackgroundScheduler
 from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict, Counter, deque
+from dateutil.rrule import rrulestr
 from PIL import Image
 
 
@@ -29,12 +50,148 @@ app.jinja_env.globals.update(datetime=datetime)
 
 # Use the provided Render PostgreSQL URL, or override via DATABASE_URL environment variable.
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Optional comma-separated read replicas; read-only helpers use them when they're healthy.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "10"))
+REPLICA_CHECK_SECONDS = float(os.getenv("REPLICA_CHECK_SECONDS", "5"))
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+REPLICA_CONNECT_TIMEOUT = int(os.getenv("REPLICA_CONNECT_TIMEOUT", "2"))
 
 # --------------------------
 # Database functions
 # --------------------------
+_last_write_at = 0.0
+_replica_state = {}
+_replica_counter = itertools.count()
+
+def note_db_write():
+    """Record that this worker just committed, so its next reads stay on the primary."""
+    global _last_write_at
+    _last_write_at = time.monotonic()
+
+class PrimaryConnection(psycopg2.extensions.connection):
+    """Primary connection that notes every commit for read-your-writes routing."""
+    def commit(self):
+        super().commit()
+        note_db_write()
+
+# The profile of the request this thread is serving, when it is being profiled.
+_profiling = threading.local()
+
+class TimedCursor(psycopg2.extensions.cursor):
+    """Cursor that charges statement time to the request being profiled, if any."""
+    def execute(self, query, vars=None):
+        profile = getattr(_profiling, "profile", None)
+        if profile is None:
+            return super().execute(query, vars)
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            profile.add_query(query, time.perf_counter() - started)
+
+    def executemany(self, query, vars_list):
+        profile = getattr(_profiling, "profile", None)
+        if profile is None:
+            return super().executemany(query, vars_list)
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            profile.add_query(query, time.perf_counter() - started)
+
 def get_db_connection():
-    return psycopg2.connect(DATABASE_URL)
+    return psycopg2.connect(DATABASE_URL, connection_factory=PrimaryConnection, cursor_factory=TimedCursor)
+
+def replica_lag_seconds(conn):
+    """Replication delay of a standby in seconds (0 when fully replayed or not a standby)."""
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT CASE
+            WHEN NOT pg_is_in_recovery() THEN 0
+            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+        END
+    """)
+    lag = float(cur.fetchone()[0])
+    cur.close()
+    return lag
+
+def open_read_connection():
+    """
+    Connection for read-only queries. Goes to a replica (round robin) unless this
+    worker wrote within READ_YOUR_WRITES_SECONDS, or every replica is down or
+    lagging more than REPLICA_MAX_LAG_SECONDS, in which case it uses the primary.
+    """
+    if not DATABASE_REPLICA_URLS or time.monotonic() - _last_write_at < READ_YOUR_WRITES_SECONDS:
+        return psycopg2.connect(DATABASE_URL, cursor_factory=TimedCursor)
+    first = next(_replica_counter)
+    for i in range(len(DATABASE_REPLICA_URLS)):
+        url = DATABASE_REPLICA_URLS[(first + i) % len(DATABASE_REPLICA_URLS)]
+        state = _replica_state.setdefault(url, {"down_until": 0.0, "checked_at": 0.0, "lag": 0.0})
+        now = time.monotonic()
+        if state["down_until"] > now:
+            continue
+        try:
+            conn = psycopg2.connect(url, connect_timeout=REPLICA_CONNECT_TIMEOUT, cursor_factory=TimedCursor)
+            if now - state["checked_at"] > REPLICA_CHECK_SECONDS:
+                state["lag"] = replica_lag_seconds(conn)
+                state["checked_at"] = now
+        except psycopg2.Error as e:
+            print(f"[DEBUG] Read replica unavailable, skipping for {REPLICA_RETRY_SECONDS}s: {e}")
+            state["down_until"] = now + REPLICA_RETRY_SECONDS
+            continue
+        if state["lag"] <= REPLICA_MAX_LAG_SECONDS:
+            return conn
+        conn.close()
+    return psycopg2.connect(DATABASE_URL, cursor_factory=TimedCursor)
+
+# Set while this thread is inside read_snapshot()
+_read_snapshot = threading.local()
+
+class SnapshotConnection:
+    """The connection shared by every read inside read_snapshot(); closing is left to the snapshot."""
+    def __init__(self, conn):
+        self.conn = conn
+
+    def cursor(self, *args, **kwargs):
+        return self.conn.cursor(*args, **kwargs)
+
+    def close(self):
+        pass
+
+@contextlib.contextmanager
+def read_snapshot():
+    """
+    Answer every get_read_connection() in the block from one connection and one
+    REPEATABLE READ transaction. Separate connections may land on replicas at
+    different replay positions, so a version read on one could claim rows another
+    hasn't received yet. The connection is only opened on the first read.
+    """
+    _read_snapshot.active = True
+    _read_snapshot.conn = None
+    try:
+        yield
+    finally:
+        snapshot = _read_snapshot.conn
+        _read_snapshot.active = False
+        _read_snapshot.conn = None
+        if snapshot is not None:
+            snapshot.conn.close()
+
+def get_read_connection():
+    if not getattr(_read_snapshot, "active", False):
+        return open_read_connection()
+    if _read_snapshot.conn is None:
+        conn = open_read_connection()
+        conn.rollback()  # the replica lag probe may have opened a transaction
+        conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+        _read_snapshot.conn = SnapshotConnection(conn)
+    return _read_snapshot.conn
+
+# Advisory lock key serializing writers of events (see the events_lock_writers trigger)
+EVENTS_WRITE_LOCK = 7265001
 
 def init_db():
     """Initialize the database by creating the events table if it doesn't exist."""
@@ -59,45 +216,921 @@ def init_db():
             image TEXT
         )
     """)
+    cur.execute("ALTER TABLE events ADD COLUMN IF NOT EXISTS image_url TEXT")
+    cur.execute("ALTER TABLE events ADD COLUMN IF NOT EXISTS image_data BYTEA")
+    cur.execute("ALTER TABLE events ADD COLUMN IF NOT EXISTS content_hash TEXT")
+    cur.execute("ALTER TABLE events ADD COLUMN IF NOT EXISTS image_format TEXT")
+    # Recurring series: the master row keeps the rule, overridden instances point back at it
+    cur.execute("ALTER TABLE events ADD COLUMN IF NOT EXISTS rrule TEXT")
+    cur.execute("ALTER TABLE events ADD COLUMN IF NOT EXISTS rdates TIMESTAMP[]")
+    cur.execute("ALTER TABLE events ADD COLUMN IF NOT EXISTS exdates TIMESTAMP[]")
+    cur.execute("ALTER TABLE events ADD COLUMN IF NOT EXISTS series_until DATE")
+    cur.execute("ALTER TABLE events ADD COLUMN IF NOT EXISTS recurrence_of TEXT")
+    cur.execute("ALTER TABLE events ADD COLUMN IF NOT EXISTS recurrence_id TIMESTAMP")
+    # Asana project an event was synced from (NULL for ICS imports and manual events)
+    cur.execute("ALTER TABLE events ADD COLUMN IF NOT EXISTS source_project TEXT")
+    # Full-text search document; being a generated column it stays current on every insert/update.
+    cur.execute("""
+        ALTER TABLE events ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(ministry, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(location, '')), 'B') ||
+            setweight(to_tsvector('english', regexp_replace(coalesce(description, ''), '<[^>]*>', ' ', 'g')), 'C')
+        ) STORED
+    """)
+    cur.execute("ALTER TABLE events ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now()")
+    cur.execute("ALTER TABLE events ADD COLUMN IF NOT EXISTS row_version BIGINT")
+    # events is partitioned by start_date year; a table from before that is converted in place.
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = 'events'::regclass")
+    if cur.fetchone()[0] != "p":
+        partition_events_table(cur)
+    today = date.today()
+    for year in range(today.year - 1, today.year + 3):
+        create_event_partition(cur, year)
+    cur.execute("CREATE INDEX IF NOT EXISTS events_search_idx ON events USING GIN (search_vector)")
+    # Date-range scans, alone or narrowed by a facet
+    cur.execute("CREATE INDEX IF NOT EXISTS events_start_date_idx ON events (start_date, start_time)")
+    cur.execute("CREATE INDEX IF NOT EXISTS events_ministry_start_idx ON events (ministry, start_date)")
+    cur.execute("CREATE INDEX IF NOT EXISTS events_location_start_idx ON events (location, start_date)")
+    cur.execute("CREATE INDEX IF NOT EXISTS events_status_start_idx ON events (event_status, start_date)")
+    cur.execute("CREATE INDEX IF NOT EXISTS events_series_idx ON events (start_date) WHERE rrule IS NOT NULL")
+    # Change tracking: rows carry updated_at, and every writing statement bumps the
+    # single-row events_meta version that the HTTP validators are derived from.
+    cur.execute("CREATE SEQUENCE IF NOT EXISTS events_version_seq")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS events_meta (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version BIGINT NOT NULL DEFAULT 0,
+            last_changed TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+    cur.execute("ALTER TABLE events_meta ADD COLUMN IF NOT EXISTS pruned_version BIGINT NOT NULL DEFAULT 0")
+    cur.execute("INSERT INTO events_meta (id) VALUES (1) ON CONFLICT (id) DO NOTHING")
+    # Per-row versions plus tombstones for deleted rows let clients ask for changes since a version.
+    cur.execute("CREATE INDEX IF NOT EXISTS events_row_version_idx ON events (row_version)")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS event_tombstones (
+            asana_task_gid TEXT,
+            version BIGINT NOT NULL,
+            deleted_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS event_tombstones_version_idx ON event_tombstones (version)")
+    # Writers take a transaction-level lock before drawing any row version, so versions
+    # commit in order: once a reader sees meta version V, every row <= V is visible.
+    cur.execute(f"""
+        CREATE OR REPLACE FUNCTION events_lock_writers() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_advisory_xact_lock({EVENTS_WRITE_LOCK});
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    cur.execute("""
+        CREATE OR REPLACE FUNCTION events_touch_row() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_at := clock_timestamp();
+            NEW.row_version := nextval('events_version_seq');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    cur.execute("""
+        CREATE OR REPLACE FUNCTION events_bump_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE events_meta SET version = nextval('events_version_seq'), last_changed = clock_timestamp()
+            WHERE id = 1;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    cur.execute("""
+        CREATE OR REPLACE FUNCTION events_record_delete() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO event_tombstones (asana_task_gid, version)
+            VALUES (OLD.asana_task_gid, nextval('events_version_seq'));
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    cur.execute("DROP TRIGGER IF EXISTS events_lock_writers ON events")
+    cur.execute("""
+        CREATE TRIGGER events_lock_writers BEFORE INSERT OR UPDATE OR DELETE OR TRUNCATE ON events
+        FOR EACH STATEMENT EXECUTE FUNCTION events_lock_writers()
+    """)
+    cur.execute("DROP TRIGGER IF EXISTS events_touch_row ON events")
+    cur.execute("""
+        CREATE TRIGGER events_touch_row BEFORE INSERT OR UPDATE ON events
+        FOR EACH ROW EXECUTE FUNCTION events_touch_row()
+    """)
+    cur.execute("DROP TRIGGER IF EXISTS events_bump_version ON events")
+    cur.execute("""
+        CREATE TRIGGER events_bump_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON events
+        FOR EACH STATEMENT EXECUTE FUNCTION events_bump_version()
+    """)
+    cur.execute("DROP TRIGGER IF EXISTS events_record_delete ON events")
+    cur.execute("""
+        CREATE TRIGGER events_record_delete AFTER DELETE ON events
+        FOR EACH ROW EXECUTE FUNCTION events_record_delete()
+    """)
+    cur.execute("UPDATE events SET row_version = nextval('events_version_seq') WHERE row_version IS NULL")
+    cur.execute("CREATE INDEX IF NOT EXISTS events_asana_task_gid_idx ON events (asana_task_gid)")
+    # Archived years (see archive_event_year) keep the same columns and indexes; events_all spans both.
+    cur.execute("CREATE TABLE IF NOT EXISTS events_archive (LIKE events INCLUDING ALL) PARTITION BY RANGE (start_date)")
+    cur.execute("""
+        SELECT a.attname, format_type(a.atttypid, a.atttypmod)
+        FROM pg_attribute a
+        WHERE a.attrelid = 'events'::regclass AND a.attnum > 0 AND NOT a.attisdropped
+          AND a.attgenerated = ''
+          AND NOT EXISTS (SELECT 1 FROM pg_attribute b WHERE b.attrelid = 'events_archive'::regclass
+                          AND b.attname = a.attname AND NOT b.attisdropped)
+        ORDER BY a.attnum
+    """)
+    for name, column_type in cur.fetchall():
+        cur.execute(f'ALTER TABLE events_archive ADD COLUMN "{name}" {column_type}')
+    # Events created by hand used to be stored without a gid; pages and /api/event/<gid> need one.
+    for table in ("events", "events_archive"):
+        cur.execute(f"UPDATE {table} SET asana_task_gid = 'manual-' || id WHERE asana_task_gid IS NULL")
+    cur.execute("DROP VIEW IF EXISTS events_all")
+    cur.execute("CREATE VIEW events_all AS SELECT * FROM events UNION ALL SELECT * FROM events_archive")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS image_cache (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            content_hash TEXT,
+            content BYTEA,
+            format TEXT,
+            status INTEGER,
+            failures INTEGER NOT NULL DEFAULT 0,
+            fetched_at TIMESTAMP,
+            retry_after TIMESTAMP
+        )
+    """)
+    cur.execute("ALTER TABLE image_cache ADD COLUMN IF NOT EXISTS format TEXT")
+    # Background jobs: claimed by `flask worker` processes with FOR UPDATE SKIP LOCKED
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id BIGSERIAL PRIMARY KEY,
+            kind TEXT NOT NULL,
+            args JSONB NOT NULL DEFAULT '{}',
+            dedupe_key TEXT,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 3,
+            run_after TIMESTAMPTZ NOT NULL DEFAULT now(),
+            progress TEXT,
+            log TEXT NOT NULL DEFAULT '',
+            result JSONB,
+            error TEXT,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            started_at TIMESTAMPTZ,
+            finished_at TIMESTAMPTZ,
+            heartbeat_at TIMESTAMPTZ
+        )
+    """)
+    # At most one queued/running job per dedupe key
+    cur.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS jobs_dedupe_idx ON jobs (dedupe_key)
+        WHERE status IN ('queued', 'running')
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS jobs_ready_idx ON jobs (run_after, id) WHERE status = 'queued'")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS asana_sync_state (
+            project_gid TEXT PRIMARY KEY,
+            last_started_at TIMESTAMP,
+            last_success_at TIMESTAMP,
+            last_stats JSONB,
+            last_error TEXT,
+            failures INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS asana_webhooks (
+            target TEXT PRIMARY KEY,
+            secret TEXT NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT now()
+        )
+    """)
+    # A row without a secret is a registration in flight; only it can complete a handshake.
+    cur.execute("ALTER TABLE asana_webhooks ALTER COLUMN secret DROP NOT NULL")
+    cur.execute("ALTER TABLE asana_webhooks ADD COLUMN IF NOT EXISTS pending_until TIMESTAMP")
     conn.commit()
     cur.close()
     conn.close()
 
-def load_events():
-    """Load all events from the database and return them as a list of dictionaries."""
+def create_event_partition(cur, year):
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS events_y{year:04d} PARTITION OF events
+        FOR VALUES FROM ('{year:04d}-01-01') TO ('{year + 1:04d}-01-01')
+    """)
+
+def partition_events_table(cur):
+    """
+    Replace an unpartitioned events table by one partitioned on start_date year,
+    moving every row (ids, images and versions included) into it.
+    """
+    print("[DEBUG] Converting events to a year-partitioned table")
+    cur.execute("ALTER TABLE events RENAME TO events_unpartitioned")
+    cur.execute("ALTER INDEX IF EXISTS events_pkey RENAME TO events_unpartitioned_pkey")
+    cur.execute("ALTER SEQUENCE IF EXISTS events_id_seq OWNED BY NONE")
+    cur.execute("""
+        CREATE TABLE events (LIKE events_unpartitioned INCLUDING DEFAULTS INCLUDING GENERATED)
+        PARTITION BY RANGE (start_date)
+    """)
+    # Unique constraints on a partitioned table must include the partition key
+    cur.execute("ALTER TABLE events ADD PRIMARY KEY (id, start_date)")
+    cur.execute("ALTER SEQUENCE IF EXISTS events_id_seq OWNED BY events.id")
+    cur.execute("SELECT DISTINCT extract(year FROM start_date)::int FROM events_unpartitioned")
+    for (year,) in cur.fetchall():
+        create_event_partition(cur, year)
+    cur.execute("""
+        SELECT string_agg(quote_ident(attname), ', ' ORDER BY attnum) FROM pg_attribute
+        WHERE attrelid = 'events_unpartitioned'::regclass AND attnum > 0 AND NOT attisdropped AND attgenerated = ''
+    """)
+    columns = cur.fetchone()[0]
+    cur.execute(f"INSERT INTO events ({columns}) SELECT {columns} FROM events_unpartitioned")
+    cur.execute("DROP TABLE events_unpartitioned")
+
+# Years this process knows to have a partition, so writes only pay for the check once.
+_event_partition_years = set()
+_event_partition_lock = threading.Lock()
+
+def event_partition_years(events):
+    return {int(str(event.get("start_date"))[:4]) for event in events if event.get("start_date")}
+
+def ensure_event_partitions(events):
+    """Create the year partitions the given events will be written into, if missing."""
+    years = event_partition_years(events)
+    with _event_partition_lock:
+        missing = years - _event_partition_years
+        if not missing:
+            return
+        conn = get_db_connection()
+        cur = conn.cursor()
+        for year in sorted(missing):
+            create_event_partition(cur, year)
+        conn.commit()
+        cur.close()
+        conn.close()
+        _event_partition_years.update(missing)
+
+def partitioned_write(write):
+    """
+    Create the year partitions for the event (or list of events) passed first before
+    `write` runs. Another process may have archived a year this one still has cached;
+    a "no partition" failure drops those years from the cache and retries once.
+    """
+    @functools.wraps(write)
+    def wrapper(events, *args, **kwargs):
+        batch = [events] if isinstance(events, dict) else events
+        ensure_event_partitions(batch)
+        try:
+            return write(events, *args, **kwargs)
+        except psycopg2.errors.CheckViolation as e:
+            if "no partition" not in str(e):
+                raise
+            print(f"[DEBUG] Partition missing, recreating: {e}")
+            with _event_partition_lock:
+                _event_partition_years.difference_update(event_partition_years(batch))
+            ensure_event_partitions(batch)
+            return write(events, *args, **kwargs)
+    return wrapper
+
+def create_upcoming_partitions():
+    """Scheduled, so the next year's partition exists before the rollover."""
+    today = date.today()
+    ensure_event_partitions([{"start_date": f"{year}-01-01"} for year in (today.year, today.year + 1)])
+
+def archive_event_year(year, detach_only=False):
+    """
+    Take a past year's partition out of the hot events table. By default it is
+    attached to events_archive, where feeds, search and event pages still find
+    it (images included); with detach_only it is left as a standalone
+    events_detached_yYYYY_<timestamp> table, e.g. to dump and drop, so a fresh
+    partition can take its place if that year is written again.
+    Returns the table the rows ended up in.
+    """
+    if year >= date.today().year:
+        raise ValueError("Only past years can be archived.")
+    partition = f"events_y{year:04d}"
+    archived = f"events_archive_y{year:04d}"
     conn = get_db_connection()
     cur = conn.cursor()
+    # Same order as writers, whose statements lock the table before the trigger takes the
+    # advisory lock; taking the advisory lock first could deadlock with one of them.
+    cur.execute("LOCK TABLE events IN ACCESS EXCLUSIVE MODE")
+    cur.execute("SELECT pg_advisory_xact_lock(%s)", (EVENTS_WRITE_LOCK,))
+    cur.execute(f"ALTER TABLE events DETACH PARTITION {partition}")
+    if detach_only:
+        archived = f"events_detached_y{year:04d}_{datetime.now():%Y%m%d%H%M%S}"
+        cur.execute(f"ALTER TABLE {partition} RENAME TO {archived}")
+    else:
+        cur.execute("SELECT to_regclass(%s)", (archived,))
+        if cur.fetchone()[0]:
+            # Year archived before: fold the late arrivals into the existing archive partition
+            cur.execute(f"""
+                SELECT string_agg(quote_ident(attname), ', ' ORDER BY attnum) FROM pg_attribute
+                WHERE attrelid = '{partition}'::regclass AND attnum > 0 AND NOT attisdropped AND attgenerated = ''
+            """)
+            columns = cur.fetchone()[0]
+            cur.execute(f"INSERT INTO events_archive ({columns}) SELECT {columns} FROM {partition}")
+            cur.execute(f"DROP TABLE {partition}")
+        else:
+            cur.execute(f"ALTER TABLE {partition} RENAME TO {archived}")
+            cur.execute(f"""
+                ALTER TABLE events_archive ATTACH PARTITION {archived}
+                FOR VALUES FROM ('{year:04d}-01-01') TO ('{year + 1:04d}-01-01')
+            """)
+    # Detaching bypasses the triggers (writers were locked out above), so bump the data version
+    # by hand. The rows leave /api/month without tombstones, so older deltas can't be answered.
     cur.execute("""
-        SELECT asana_task_gid, event_status, ministry, organizer, website_trigger, registration, title,
-               start_date, start_time, end_date, end_time, location, description, image, image_url,
-               CASE WHEN image_data IS NOT NULL THEN true ELSE false END as image_data
-        FROM events
+        UPDATE events_meta SET version = nextval('events_version_seq'), last_changed = clock_timestamp()
+        WHERE id = 1
+        RETURNING version
     """)
-    rows = cur.fetchall()
-    events = []
-    for row in rows:
-        events.append({
-            "asana_task_gid": row[0],
-            "event_status": row[1],
-            "ministry": row[2],
-            "organizer": row[3],
-            "website_trigger": row[4],
-            "registration": row[5],
-            "title": row[6],
-            "start_date": row[7].strftime("%Y-%m-%d") if row[7] else "",
-            "start_time": row[8].strftime("%H:%M") if row[8] else "",
-            "end_date": row[9].strftime("%Y-%m-%d") if row[9] else "",
-            "end_time": row[10].strftime("%H:%M") if row[10] else "",
-            "location": row[11],
-            "description": row[12],
-            "image": row[13],
-            "image_url": row[14],
-            "image_data": row[15]
-        })
+    cur.execute("UPDATE events_meta SET pruned_version = %s WHERE id = 1", (cur.fetchone()[0],))
+    conn.commit()
+    cur.close()
+    conn.close()
+    with _event_partition_lock:
+        _event_partition_years.discard(year)
+    return archived
+
+@app.cli.command("archive-year")
+@click.argument("year", type=int)
+@click.option("--detach-only", is_flag=True, help="Leave the partition as a standalone table instead of archiving it.")
+def archive_year_command(year, detach_only):
+    """Move a past YEAR of events out of the hot table."""
+    table = archive_event_year(year, detach_only)
+    print(f"Year {year} {'detached' if detach_only else 'archived'} into {table}.")
+
+@app.cli.command("init-db")
+def init_db_command():
+    """Create or migrate the database schema."""
+    init_db()
+    print("Database initialized.")
+
+# Columns an event can be filtered on, keyed by their query-string parameter.
+EVENT_FILTER_COLUMNS = {
+    "ministry": "ministry",
+    "location": "location",
+    "status": "event_status",
+    "website_trigger": "website_trigger",
+    "project": "source_project"
+}
+
+def event_filters_from_request():
+    """Collect repeatable filter parameters (?ministry=A&ministry=B&status=...) from the request."""
+    filters = {}
+    for param in EVENT_FILTER_COLUMNS:
+        values = [value for value in request.args.getlist(param) if value]
+        if values:
+            filters[param] = values
+    return filters
+
+def event_filter_conditions(start_date=None, end_date=None, filters=None, exclude=None, since=None):
+    """Build SQL conditions and params for a date range plus facet filters (and rows changed after `since`)."""
+    conditions = []
+    params = []
+    if since is not None:
+        conditions.append("row_version > %s")
+        params.append(since)
+    if start_date:
+        conditions.append("start_date >= %s")
+        params.append(start_date)
+    if end_date:
+        conditions.append("start_date <= %s")
+        params.append(end_date)
+    for param, values in (filters or {}).items():
+        if param == exclude:
+            continue
+        conditions.append(f"{EVENT_FILTER_COLUMNS[param]} = ANY(%s)")
+        params.append(list(values))
+    return conditions, params
+
+EVENT_SELECT_COLUMNS = """
+    asana_task_gid, event_status, ministry, organizer, website_trigger, registration, title,
+    start_date, start_time, end_date, end_time, location, description, image, image_url,
+    CASE WHEN image_data IS NOT NULL THEN true ELSE false END as image_data, rrule, image_format
+"""
+
+def event_from_row(row):
+    return {
+        "asana_task_gid": row[0],
+        "event_status": row[1],
+        "ministry": row[2],
+        "organizer": row[3],
+        "website_trigger": row[4],
+        "registration": row[5],
+        "title": row[6],
+        "start_date": row[7].strftime("%Y-%m-%d") if row[7] else "",
+        "start_time": row[8].strftime("%H:%M") if row[8] else "",
+        "end_date": row[9].strftime("%Y-%m-%d") if row[9] else "",
+        "end_time": row[10].strftime("%H:%M") if row[10] else "",
+        "location": row[11],
+        "description": row[12],
+        "image": row[13],
+        "image_url": row[14],
+        "image_data": row[15],
+        "rrule": row[16],
+        "image_format": row[17]
+    }
+
+# How far ahead an open-ended request (e.g. "upcoming from today") expands recurring series.
+SERIES_OPEN_WINDOW_DAYS = int(os.getenv("SERIES_OPEN_WINDOW_DAYS", "90"))
+
+@app.cli.command("db-status")
+def db_status_command():
+    """Show primary/replica health and where reads are currently routed."""
+    for label, url in [("primary", DATABASE_URL)] + [("replica", url) for url in DATABASE_REPLICA_URLS]:
+        try:
+            conn = psycopg2.connect(url, connect_timeout=REPLICA_CONNECT_TIMEOUT)
+            print(f"{label} {conn.get_dsn_parameters().get('host')}:{conn.get_dsn_parameters().get('port')} "
+                  f"up, lag {replica_lag_seconds(conn):.1f}s")
+            conn.close()
+        except psycopg2.Error as e:
+            print(f"{label} down: {e}")
+    conn = get_read_connection()
+    params = conn.get_dsn_parameters()
+    print(f"reads -> {params.get('host')}:{params.get('port')}/{params.get('dbname')}")
+    conn.close()
+
+def load_events(start_date=None, end_date=None, filters=None, since=None, include_archive=False):
+    """
+    Load events from the database and return them as a list of dictionaries,
+    ordered by start. Optionally limited to start dates in [start_date, end_date],
+    to the given facet filters and to rows changed after version `since`.
+    Archived years are only read with include_archive.
+
+    When a window is given, recurring series are expanded into their occurrences
+    within it (an open end expands SERIES_OPEN_WINDOW_DAYS ahead). Without a
+    window each series appears once, as its first occurrence.
+    """
+    conditions, params = event_filter_conditions(start_date, end_date, filters, since=since)
+    if start_date:
+        conditions.append("rrule IS NULL")
+    where = "WHERE " + " AND ".join(conditions) if conditions else ""
+    conn = get_read_connection()
+    cur = conn.cursor()
+    table = "events_all" if include_archive else "events"
+    cur.execute("SELECT " + EVENT_SELECT_COLUMNS + " FROM " + table + " " + where + " ORDER BY start_date, start_time",
+                params)
+    events = [event_from_row(row) for row in cur.fetchall()]
     cur.close()
     conn.close()
+    if start_date:
+        window_end = end_date or start_date + timedelta(days=SERIES_OPEN_WINDOW_DAYS)
+        occurrences = expand_series(start_date, window_end, filters, since)
+        if occurrences:
+            events.extend(occurrences)
+            events.sort(key=lambda ev: (ev["start_date"], ev["start_time"]))
     return events
 
+def load_upcoming_events(from_date, filters=None):
+    """Events starting on or after `from_date`, soonest first."""
+    return load_events(start_date=from_date, filters=filters)
+
+# --------------------------
+# Recurring Events
+# --------------------------
+# A recurring series is stored once: its master row carries the RRULE plus RDATE /
+# EXDATE lists, with start_date being the first occurrence. Occurrences are only
+# computed for the window a request asks for, and memoized per (series version,
+# window). Overridden instances are ordinary rows (recurrence_of = master gid);
+# their original start is folded into the master's exdates at import time.
+SERIES_CACHE_SIZE = int(os.getenv("SERIES_CACHE_SIZE", "2048"))
+_series_cache = OrderedDict()
+_series_cache_lock = threading.Lock()
+
+def load_series_masters(window_start, window_end, filters=None, since=None):
+    """Series masters whose occurrences may fall inside the window."""
+    conditions, params = event_filter_conditions(filters=filters, since=since)
+    conditions += ["rrule IS NOT NULL", "start_date <= %s", "(series_until IS NULL OR series_until >= %s)"]
+    params += [window_end, window_start]
+    conn = get_read_connection()
+    cur = conn.cursor()
+    # Masters are few, and an archived one can still be repeating today
+    cur.execute("SELECT " + EVENT_SELECT_COLUMNS + ", rdates, exdates, content_hash FROM events_all WHERE " +
+                " AND ".join(conditions), params)
+    masters = []
+    for row in cur.fetchall():
+        master = event_from_row(row)
+        master["rdates"] = row[18] or []
+        master["exdates"] = row[19] or []
+        master["content_hash"] = row[20]
+        masters.append(master)
+    cur.close()
+    conn.close()
+    return masters
+
+def build_series_rule(rrule, first_start, rdates=(), exdates=()):
+    rule = rrulestr(rrule, dtstart=first_start, forceset=True)
+    for rdate in rdates:
+        rule.rdate(rdate)
+    for exdate in exdates:
+        rule.exdate(exdate)
+    return rule
+
+def series_occurrences(master, window_start, window_end):
+    """Start datetimes of a series within [window_start, window_end], memoized."""
+    key = (master["asana_task_gid"], master["content_hash"], window_start, window_end)
+    with _series_cache_lock:
+        if key in _series_cache:
+            _series_cache.move_to_end(key)
+            return _series_cache[key]
+    first_start = datetime.strptime(f"{master['start_date']} {master['start_time']}", "%Y-%m-%d %H:%M")
+    try:
+        rule = build_series_rule(master["rrule"], first_start, master["rdates"], master["exdates"])
+        starts = rule.between(datetime.combine(window_start, datetime.min.time()),
+                              datetime.combine(window_end, datetime.max.time()), inc=True)
+    except (ValueError, TypeError) as e:
+        print(f"[DEBUG] Bad recurrence rule for {master['asana_task_gid']}: {e}")
+        starts = []
+    with _series_cache_lock:
+        _series_cache[key] = starts
+        while len(_series_cache) > SERIES_CACHE_SIZE:
+            _series_cache.popitem(last=False)
+    return starts
+
+def expand_series(window_start, window_end, filters=None, since=None):
+    """Occurrence dictionaries of every recurring series within the window."""
+    occurrences = []
+    for master in load_series_masters(window_start, window_end, filters, since):
+        first_start = datetime.strptime(f"{master['start_date']} {master['start_time']}", "%Y-%m-%d %H:%M")
+        try:
+            duration = datetime.strptime(f"{master['end_date']} {master['end_time']}", "%Y-%m-%d %H:%M") - first_start
+        except ValueError:
+            duration = timedelta(hours=1)
+        for start in series_occurrences(master, window_start, window_end):
+            occurrence = {key: value for key, value in master.items()
+                          if key not in ("rdates", "exdates", "content_hash")}
+            end = start + duration
+            occurrence.update({
+                "start_date": start.strftime("%Y-%m-%d"),
+                "start_time": start.strftime("%H:%M"),
+                "end_date": end.strftime("%Y-%m-%d"),
+                "end_time": end.strftime("%H:%M")
+            })
+            occurrences.append(occurrence)
+    return occurrences
+
+def series_until_date(rrule, first_start, rdates=(), exdates=()):
+    """Last date a series can occur on, or None if it repeats forever."""
+    rule = build_series_rule(rrule, first_start, rdates, exdates)
+    if "COUNT=" not in rrule.upper() and "UNTIL=" not in rrule.upper():
+        return None
+    last = None
+    for last in rule:
+        pass
+    return last.date() if last else first_start.date()
+
+def month_range(year, month):
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+def year_range(year):
+    return date(year, 1, 1), date(year, 12, 31)
+
+def count_event_facets(start_date=None, end_date=None, filters=None):
+    """
+    Count events per ministry, location, status and website trigger within the
+    date range. Each facet's counts apply every filter except its own, so the
+    counts show what selecting another value of that facet would return.
+    Recurring series count once per occurrence in the range, as load_events lists them.
+    """
+    selects = []
+    params = []
+    for param, column in EVENT_FILTER_COLUMNS.items():
+        conditions, condition_params = event_filter_conditions(start_date, end_date, filters, exclude=param)
+        if start_date:
+            conditions.append("rrule IS NULL")
+        where = "WHERE " + " AND ".join(conditions) if conditions else ""
+        selects.append(f"SELECT %s, {column}, count(*) FROM events {where} GROUP BY {column}")
+        params.extend([param] + condition_params)
+    conn = get_read_connection()
+    cur = conn.cursor()
+    cur.execute(" UNION ALL ".join(selects), params)
+    facets = {param: {} for param in EVENT_FILTER_COLUMNS}
+    for param, value, count in cur.fetchall():
+        facets[param][value or ""] = count
+    cur.close()
+    conn.close()
+    if start_date:
+        window_end = end_date or start_date + timedelta(days=SERIES_OPEN_WINDOW_DAYS)
+        expanded = {}
+        for param, column in EVENT_FILTER_COLUMNS.items():
+            others = {key: values for key, values in (filters or {}).items() if key != param}
+            key = tuple(sorted((name, tuple(values)) for name, values in others.items()))
+            if key not in expanded:
+                expanded[key] = expand_series(start_date, window_end, others)
+            for occurrence in expanded[key]:
+                value = occurrence.get(column) or ""
+                facets[param][value] = facets[param].get(value, 0) + 1
+    return facets
+
+# Fields sent once per event in the /api/month payload; the rest comes from /api/event/<gid> on demand.
+MONTH_EVENT_FIELDS = ("title", "start_time", "end_time", "image")
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+
+def month_payload(events):
+    """
+    Columnar form of a month's events: day -> gids in start order, plus one body
+    per gid as parallel field lists (a series occurring weekly is sent once).
+    `image_src` is the stored image's URL, or "" when the event has none.
+    """
+    days = {}
+    bodies = {}
+    for ev in events:
+        gid = ev["asana_task_gid"]
+        days.setdefault(str(int(ev["start_date"][8:10])), []).append(gid)
+        bodies.setdefault(gid, ev)
+    columns = {"gid": list(bodies)}
+    for field in MONTH_EVENT_FIELDS:
+        columns[field] = [body[field] for body in bodies.values()]
+    columns["image_src"] = [event_image_url(gid, body.get("image_format")) if body["image_data"] else ""
+                            for gid, body in bodies.items()]
+    return days, columns
+
+def changed_event_gids(since):
+    """
+    Gids of events inserted, updated or deleted after version `since`, or None when
+    tombstones that old have been pruned and the caller has to start from scratch.
+    """
+    conn = get_read_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT pruned_version FROM events_meta WHERE id = 1")
+    row = cur.fetchone()
+    gids = None
+    if not row or since >= row[0]:
+        cur.execute("""
+            SELECT asana_task_gid FROM events WHERE row_version > %s
+            UNION
+            SELECT asana_task_gid FROM event_tombstones WHERE version > %s
+        """, (since, since))
+        gids = {r[0] for r in cur.fetchall()}
+    cur.close()
+    conn.close()
+    return gids
+
+def prune_event_tombstones():
+    """Drop tombstones past the retention window, remembering the newest version dropped."""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        WITH pruned AS (
+            DELETE FROM event_tombstones WHERE deleted_at < now() - %s * interval '1 day' RETURNING version
+        )
+        UPDATE events_meta SET pruned_version = GREATEST(pruned_version, (SELECT max(version) FROM pruned))
+        WHERE id = 1
+    """, (TOMBSTONE_RETENTION_DAYS,))
+    conn.commit()
+    cur.close()
+    conn.close()
+
+# --------------------------
+# Conditional GET
+# --------------------------
+def compute_app_version():
+    """Fingerprint of the code and templates, so a deploy invalidates cached pages."""
+    digest = hashlib.sha1(os.getenv("RENDER_GIT_COMMIT", "").encode("utf-8"))
+    root = os.path.dirname(os.path.abspath(__file__))
+    paths = [os.path.join(root, "app.py")]
+    for folder in ("templates", "static"):
+        for dirpath, _, filenames in os.walk(os.path.join(root, folder)):
+            paths.extend(os.path.join(dirpath, name) for name in filenames)
+    for path in sorted(paths):
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+APP_VERSION = compute_app_version()
+
+def get_data_version():
+    """Return (version, last_changed) of the events table; one single-row read."""
+    conn = get_read_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT version, last_changed FROM events_meta WHERE id = 1")
+    row = cur.fetchone()
+    cur.close()
+    conn.close()
+    return row if row else (0, None)
+
+def conditional_get(view):
+    """
+    Give a read endpoint ETag/Last-Modified validators and answer matching
+    revalidations with 304 before the view loads or renders anything. The
+    validators cover the data version, the request URL, today's date (views
+    are relative to today) and the deployed code.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return view(*args, **kwargs)
+        try:
+            version, last_changed = get_data_version()
+        except psycopg2.Error as e:
+            print(f"[DEBUG] Data version unavailable, serving without validators: {e}")
+            return view(*args, **kwargs)
+        today = date.today()
+        etag = hashlib.sha1(f"{APP_VERSION}:{version}:{today}:{request.full_path}".encode("utf-8")).hexdigest()[:24]
+        midnight = pytz.utc.localize(datetime.utcnow()).astimezone().replace(hour=0, minute=0, second=0, microsecond=0)
+        last_modified = max(last_changed, midnight) if last_changed else midnight
+        last_modified = last_modified.replace(microsecond=0)
+
+        not_modified = False
+        if request.if_none_match:
+            not_modified = request.if_none_match.contains(etag)
+        elif request.if_modified_since:
+            not_modified = last_modified <= request.if_modified_since
+        g.data_version = version
+        if not_modified:
+            response = Response(status=304)
+        else:
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+    return wrapper
+
+# --------------------------
+# Request Profiling
+# --------------------------
+# Opt-in: requests carrying `X-Profile: <ADMIN_TOKEN>`, plus a random PROFILE_SAMPLE_RATE
+# share of all requests, are profiled; everything else skips straight past the hooks.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_SECONDS = float(os.getenv("PROFILE_INTERVAL_SECONDS", "0.005"))
+PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", "50"))
+_profiles = deque(maxlen=PROFILE_BUFFER_SIZE)
+_profiles_lock = threading.Lock()
+_profile_ids = itertools.count(1)
+
+class RequestProfile:
+    """
+    Wall, DB and template time of one request, plus its Python stacks sampled
+    every PROFILE_INTERVAL_SECONDS by a helper thread (collapsed-stack format,
+    ready for flamegraph.pl or speedscope).
+    """
+    def __init__(self, reason):
+        self.id = next(_profile_ids)
+        self.reason = reason
+        self.method = request.method
+        self.path = request.full_path.rstrip("?")
+        self.status = None
+        self.started_at = datetime.utcnow()
+        self.started = time.perf_counter()
+        self.db_seconds = 0.0
+        self.queries = Counter()
+        self.query_seconds = Counter()
+        self.template_seconds = 0.0
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._sample, args=(threading.get_ident(),), daemon=True)
+        self.thread.start()
+
+    def add_query(self, query, seconds):
+        if isinstance(query, bytes):  # execute_values composes its statements as bytes
+            query = query.decode("utf-8", errors="replace")
+        statement = " ".join(str(query).split())[:200]
+        self.db_seconds += seconds
+        self.queries[statement] += 1
+        self.query_seconds[statement] += seconds
+
+    def _sample(self, thread_id):
+        while not self.stopped.wait(PROFILE_INTERVAL_SECONDS):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                where = "/".join(code.co_filename.replace(os.sep, "/").split("/")[-2:])
+                stack.append(f"{code.co_name} ({where}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def finish(self):
+        self.stopped.set()
+        self.thread.join()
+        self.total_seconds = time.perf_counter() - self.started
+
+    def summary(self):
+        self_samples = Counter()
+        for stack, count in self.stacks.items():
+            self_samples[stack.rsplit(";", 1)[-1]] += count
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "reason": self.reason,
+            "started_at": self.started_at.isoformat() + "Z",
+            "total_ms": round(self.total_seconds * 1000, 1),
+            "db_ms": round(self.db_seconds * 1000, 1),
+            "db_queries": sum(self.queries.values()),
+            "template_ms": round(self.template_seconds * 1000, 1),
+            "samples": sum(self.stacks.values()),
+            "hotspots": [{"frame": frame, "samples": count} for frame, count in self_samples.most_common(15)],
+            "slowest_queries": [{"query": query, "calls": self.queries[query], "ms": round(seconds * 1000, 1)}
+                                for query, seconds in self.query_seconds.most_common(10)]
+        }
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+class ProfiledTemplate(jinja2.Template):
+    """Charges top-level template rendering to the request being profiled (includes render inside it)."""
+    def render(self, *args, **kwargs):
+        profile = getattr(_profiling, "profile", None)
+        if profile is None:
+            return super().render(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            profile.template_seconds += time.perf_counter() - started
+
+app.jinja_env.template_class = ProfiledTemplate
+
+def admin_token_matches(token):
+    return bool(ADMIN_TOKEN) and bool(token) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+@app.before_request
+def start_profiling():
+    _profiling.profile = None
+    if not ADMIN_TOKEN and not PROFILE_SAMPLE_RATE:
+        return
+    if admin_token_matches(request.headers.get("X-Profile")):
+        _profiling.profile = RequestProfile("requested")
+    elif PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        _profiling.profile = RequestProfile("sampled")
+
+@app.after_request
+def tag_profiled_response(response):
+    profile = getattr(_profiling, "profile", None)
+    if profile is not None:
+        profile.status = response.status_code
+        response.headers["X-Profile-Id"] = str(profile.id)
+    return response
+
+@app.teardown_request
+def finish_profiling(exc):
+    profile = getattr(_profiling, "profile", None)
+    if profile is None:
+        return
+    _profiling.profile = None
+    profile.finish()
+    if profile.status is None:
+        profile.status = 500
+    with _profiles_lock:
+        _profiles.append(profile)
+
+@app.route("/admin/profiles")
+@app.route("/admin/profiles/<int:profile_id>")
+def admin_profiles(profile_id=None):
+    """
+    Recent request profiles (needs ADMIN_TOKEN as X-Admin-Token or ?token=).
+    One profile's stacks come back as collapsed text with ?format=collapsed.
+    """
+    if not admin_token_matches(request.headers.get("X-Admin-Token") or request.args.get("token")):
+        return jsonify({"error": "Forbidden"}), 403
+    with _profiles_lock:
+        profiles = list(_profiles)
+    if profile_id is None:
+        return jsonify([profile.summary() for profile in reversed(profiles)])
+    profile = next((p for p in profiles if p.id == profile_id), None)
+    if profile is None:
+        return jsonify({"error": "Profile not found (it may have been evicted)"}), 404
+    if request.args.get("format") == "collapsed":
+        return Response(profile.collapsed(), mimetype="text/plain")
+    summary = profile.summary()
+    summary["stacks"] = profile.collapsed()
+    return jsonify(summary)
+
+# Content types for the stored image_format. Image.MIME stays empty until Pillow
+# has loaded its plugins, so a fresh worker can't rely on it.
+IMAGE_MIME_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png", "GIF": "image/gif", "WEBP": "image/webp"}
+
+IMAGE_EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "GIF": ".gif", "WEBP": ".webp"}
+
+def image_mime_type(image_format):
+    return IMAGE_MIME_TYPES.get((image_format or "").upper(), "image/jpeg")
+
+def image_extension(image_format):
+    return IMAGE_EXTENSIONS.get((image_format or "").upper(), ".jpg")
+
+@app.template_global()
+def event_image_url(asana_task_gid, image_format=None):
+    """
+    URL of an event's stored image. A static export writes each image with its
+    extension, since a static host picks the content type from the file name.
+    """
+    url = url_for("event_image", event_id=asana_task_gid)
+    if g.get("static_export"):
+        url += image_extension(image_format)
+    return url
 
 @app.route('/event_image/<event_id>')
 def event_image(event_id):
@@ -106,22 +1139,22 @@ def event_image(event_id):
     cur = None
     
     try:
-        conn = get_db_connection()
+        conn = get_read_connection()
         cur = conn.cursor()
         
         # Debug info
         print(f"Fetching image for event ID: {event_id}")
         
         # Use simple binary data selection to avoid encoding issues
-        cur.execute("SELECT image_data FROM events WHERE asana_task_gid = %s", (event_id,))
+        cur.execute("SELECT image_data, image_format FROM events_all WHERE asana_task_gid = %s", (event_id,))
         result = cur.fetchone()
         
         if result and result[0]:  # If image data exists
             # Debug info
             print(f"Found image data for event ID {event_id}: {len(result[0])} bytes")
             
-            # Default to JPEG content type
-            content_type = 'image/jpeg'
+            # Use the format sniffed at download time, defaulting to JPEG
+            content_type = image_mime_type(result[1])
             
             # Serve the image directly from the database
             return Response(result[0], mimetype=content_type)
@@ -138,10 +1171,17 @@ def event_image(event_id):
         if conn:
             conn.close()
 
-def add_event(event):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
+EVENT_INSERT_SQL = """
+     INSERT INTO events (
+         asana_task_gid, event_status, ministry, organizer, website_trigger, registration, title,
+         start_date, start_time, end_date, end_time, location, description, image, image_url, image_data,
+         image_format, content_hash, rrule, rdates, exdates, series_until, recurrence_of, recurrence_id,
+         source_project
+     )
+     VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+def event_insert_params(event):
     # Prepare image_data for database insertion
     image_data = None
     if "image_data" in event and event["image_data"]:
@@ -150,15 +1190,7 @@ def add_event(event):
             image_data = psycopg2.Binary(event["image_data"])
         else:
             image_data = event["image_data"]
-        
-    cur.execute("""
-         INSERT INTO events (
-             asana_task_gid, event_status, ministry, organizer, website_trigger, registration, title,
-             start_date, start_time, end_date, end_time, location, description, image, image_url, image_data
-         )
-         VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-         RETURNING id
-    """, (
+    return (
          event.get("asana_task_gid"),
          event.get("event_status"),
          event.get("ministry"),
@@ -174,8 +1206,23 @@ def add_event(event):
          event.get("description"),
          event.get("image"),
          event.get("image_url"),
-         image_data
-    ))
+         image_data,
+         event.get("image_format") if image_data else None,
+         event_content_hash(event),
+         event.get("rrule"),
+         event.get("rdates") or None,
+         event.get("exdates") or None,
+         event.get("series_until"),
+         event.get("recurrence_of"),
+         event.get("recurrence_id"),
+         event.get("source_project")
+    )
+
+@partitioned_write
+def add_event(event):
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute(EVENT_INSERT_SQL + " RETURNING id", event_insert_params(event))
     new_id = cur.fetchone()[0]
     conn.commit()
     cur.close()
@@ -184,32 +1231,177 @@ def add_event(event):
     return event
 
 
-def event_exists(asana_task_gid):
-    """Check if an event with the given Asana task gid exists."""
+@partitioned_write
+def add_events(events):
+    """Insert a batch of events in a single transaction."""
     conn = get_db_connection()
     cur = conn.cursor()
-    cur.execute("SELECT COUNT(*) FROM events WHERE asana_task_gid = %s", (asana_task_gid,))
-    count = cur.fetchone()[0]
+    # An event coming back from an archived year (see diff_events) replaces its archived row
+    execute_unarchive(cur, [event["asana_task_gid"] for event in events])
+    cur.executemany(EVENT_INSERT_SQL, [event_insert_params(event) for event in events])
+    conn.commit()
     cur.close()
     conn.close()
-    return count > 0
+    return len(events)
 
-def get_event(asana_task_gid):
-    """Retrieve an event record by its asana_task_gid."""
+# Source fields that make up an event's content hash. The image bytes are
+# represented by their URL: a changed URL is the only reason to re-download.
+HASHED_EVENT_FIELDS = (
+    "event_status", "ministry", "organizer", "website_trigger", "registration", "title",
+    "start_date", "start_time", "end_date", "end_time", "location", "description", "image_url"
+)
+
+def event_content_hash(event):
+    """Hash the normalized source fields of an event."""
+    normalized = [str(event.get(field) or "").strip() for field in HASHED_EVENT_FIELDS]
+    if event.get("rrule") or event.get("recurrence_of"):
+        # Only series take part, so hashes of ordinary events stay as they were.
+        normalized += [str(event.get(field) or "") for field in
+                       ("rrule", "rdates", "exdates", "recurrence_of", "recurrence_id")]
+    if event.get("source_project"):
+        # Likewise only synced events; a task moving between projects re-tags its row.
+        normalized.append(str(event["source_project"]))
+    return hashlib.sha256("\x1f".join(normalized).encode("utf-8")).hexdigest()
+
+def existing_event_hashes(asana_task_gids):
+    """
+    Return {asana_task_gid: (content_hash, image_url)} for the gids that already
+    have a row. Archived rows count too, so syncs don't re-import history.
+    """
+    if not asana_task_gids:
+        return {}
     conn = get_db_connection()
     cur = conn.cursor()
     cur.execute("""
-        SELECT asana_task_gid, event_status, ministry, organizer, website_trigger, registration, title,
-               to_char(start_date, 'YYYY-MM-DD'), to_char(start_time, 'HH24:MI'),
-               to_char(end_date, 'YYYY-MM-DD'), to_char(end_time, 'HH24:MI'),
-               location, description, image, image_url,
-               CASE WHEN image_data IS NOT NULL THEN true ELSE false END as has_image_data
-        FROM events WHERE asana_task_gid = %s
-    """, (asana_task_gid,))
-    row = cur.fetchone()
+        SELECT asana_task_gid, content_hash, image_url FROM events_all WHERE asana_task_gid = ANY(%s)
+    """, (list(asana_task_gids),))
+    found = {row[0]: (row[1], row[2]) for row in cur.fetchall()}
     cur.close()
     conn.close()
-    if row:
+    return found
+
+def archived_event_gids(asana_task_gids):
+    """{asana_task_gid: start_date} for the gids whose rows live in events_archive rather than the hot table."""
+    if not asana_task_gids:
+        return {}
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT asana_task_gid, start_date FROM events_archive WHERE asana_task_gid = ANY(%s)",
+                (list(asana_task_gids),))
+    found = {row[0]: row[1] for row in cur.fetchall()}
+    cur.close()
+    conn.close()
+    return found
+
+def leaves_archive(event, archived_start):
+    """
+    Whether a change to an archived row should move it back to the hot table: series
+    masters still expand into current months, and an event whose date moved out of
+    its archived year no longer belongs there. Other changes to history are ignored.
+    """
+    return bool(event.get("rrule")) or str(event.get("start_date"))[:4] != f"{archived_start.year:04d}"
+
+def execute_unarchive(cur, asana_task_gids):
+    """Drop the archived rows of gids about to be inserted into the hot table, in the caller's transaction."""
+    cur.execute("DELETE FROM events_archive WHERE asana_task_gid = ANY(%s)", (list(asana_task_gids),))
+
+def keep_first_seen_dates(events, undated_gids):
+    """
+    Undated Asana tasks are placed on the day they are first synced. Put ones that
+    already have a row back on their stored date, so they aren't rewritten daily.
+    """
+    gids = [event["asana_task_gid"] for event in events if event["asana_task_gid"] in undated_gids]
+    if not gids:
+        return
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT asana_task_gid, start_date, end_date FROM events_all WHERE asana_task_gid = ANY(%s)", (gids,))
+    stored = {row[0]: (str(row[1]), str(row[2] or row[1])) for row in cur.fetchall()}
+    cur.close()
+    conn.close()
+    for event in events:
+        if event["asana_task_gid"] in stored:
+            event["start_date"], event["end_date"] = stored[event["asana_task_gid"]]
+
+def diff_events(events):
+    """
+    Split freshly built events into (new, changed, unchanged_count) against the
+    stored content hashes. Changed events whose image URL is the same drop their
+    "image_data" key so the stored image is kept and nothing is downloaded.
+    """
+    existing = existing_event_hashes([event["asana_task_gid"] for event in events])
+    archived = archived_event_gids(list(existing))
+    new, changed, unchanged = [], [], 0
+    for event in events:
+        stored = existing.get(event["asana_task_gid"])
+        if event["asana_task_gid"] in archived and stored[0] != event_content_hash(event):
+            if leaves_archive(event, archived[event["asana_task_gid"]]):
+                # Reinserted into the hot table; add_events removes the archived copy
+                print(f"[DEBUG] Moving archived event {event['asana_task_gid']} back to events")
+                new.append(event)
+            else:
+                # Counted as unchanged rather than "updated" for nothing
+                print(f"[DEBUG] Skipping change to archived event {event['asana_task_gid']}")
+                unchanged += 1
+            continue
+        if stored is None:
+            new.append(event)
+            continue
+        stored_hash, stored_image_url = stored
+        if stored_hash == event_content_hash(event):
+            unchanged += 1
+            continue
+        if (stored_image_url or "") == (event.get("image_url") or ""):
+            event.pop("image_data", None)
+        changed.append(event)
+    return new, changed, unchanged
+
+def needs_image_download(event):
+    return "image_data" in event and not event["image_data"] and bool(event.get("image"))
+
+EVENT_DETAIL_CACHE_SIZE = int(os.getenv("EVENT_DETAIL_CACHE_SIZE", "1024"))
+# (gid, data version) -> detail payload; entries of older versions simply age out.
+_event_detail_cache = OrderedDict()
+_event_detail_cache_lock = threading.Lock()
+
+def event_detail(asana_task_gid, version):
+    """What the modal and tooltip show for one event, memoized per data version."""
+    # Static exports link images by file name, so they get their own entries
+    key = (asana_task_gid, version, g.get("static_export", False))
+    with _event_detail_cache_lock:
+        if key in _event_detail_cache:
+            _event_detail_cache.move_to_end(key)
+            return _event_detail_cache[key]
+    event = get_event(asana_task_gid)
+    detail = None
+    if event:
+        detail = {field: event[field] for field in (
+            "asana_task_gid", "title", "start_date", "start_time", "end_date", "end_time",
+            "location", "organizer", "ministry", "registration", "description")}
+        detail["image"] = (event_image_url(asana_task_gid, event["image_format"]) if event["image_data"]
+                           else event["image"] or "")
+    with _event_detail_cache_lock:
+        _event_detail_cache[key] = detail
+        while len(_event_detail_cache) > EVENT_DETAIL_CACHE_SIZE:
+            _event_detail_cache.popitem(last=False)
+    return detail
+
+def get_event(asana_task_gid):
+    """Retrieve an event record by its asana_task_gid."""
+    conn = get_read_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT asana_task_gid, event_status, ministry, organizer, website_trigger, registration, title,
+               to_char(start_date, 'YYYY-MM-DD'), to_char(start_time, 'HH24:MI'),
+               to_char(end_date, 'YYYY-MM-DD'), to_char(end_time, 'HH24:MI'),
+               location, description, image, image_url,
+               CASE WHEN image_data IS NOT NULL THEN true ELSE false END as has_image_data, image_format
+        FROM events_all WHERE asana_task_gid = %s
+    """, (asana_task_gid,))
+    row = cur.fetchone()
+    cur.close()
+    conn.close()
+    if row:
         return {
             "asana_task_gid": row[0],
             "event_status": row[1],
@@ -226,7 +1418,8 @@ def get_event(asana_task_gid):
             "description": row[12],
             "image": row[13],
             "image_url": row[14],
-            "image_data": row[15]  # This is just a boolean indicating presence of image data
+            "image_data": row[15],  # This is just a boolean indicating presence of image data
+            "image_format": row[16]
         }
     return None
 
@@ -250,15 +1443,21 @@ def sanitize_html(html_content):
     return str(soup)
 
 
-def update_event(event):
-    """Update an existing event in the database based on asana_task_gid."""
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    # Prepare image_data for database insertion if it exists
-    image_data = None
-    if "image_data" in event and event["image_data"]:
-        image_data = psycopg2.Binary(event["image_data"])
+def execute_event_update(cur, event):
+    """
+    Run the UPDATE for one event on an open cursor. The image bytes are only
+    replaced when the event carries an "image_data" key, so callers can update
+    the text fields while keeping an already-downloaded image.
+    """
+    image_columns = ""
+    image_params = ()
+    if "image_data" in event:
+        # Prepare image_data for database insertion if it exists
+        image_data = None
+        if event["image_data"]:
+            image_data = psycopg2.Binary(event["image_data"])
+        image_columns = ", image_data = %s, image_format = %s"
+        image_params = (image_data, event.get("image_format") if image_data else None)
         
     cur.execute("""
          UPDATE events
@@ -276,7 +1475,14 @@ def update_event(event):
              description = %s,
              image = %s,
              image_url = %s,
-             image_data = %s
+             content_hash = %s,
+             rrule = %s,
+             rdates = %s,
+             exdates = %s,
+             series_until = %s,
+             recurrence_of = %s,
+             recurrence_id = %s,
+             source_project = %s""" + image_columns + """
          WHERE asana_task_gid = %s
          RETURNING id
     """, (
@@ -294,16 +1500,67 @@ def update_event(event):
          event.get("description"),
          event.get("image"),
          event.get("image_url"),
-         image_data,
-         event.get("asana_task_gid")
-    ))
-    updated_id = cur.fetchone()[0]
+         event_content_hash(event),
+         event.get("rrule"),
+         event.get("rdates") or None,
+         event.get("exdates") or None,
+         event.get("series_until"),
+         event.get("recurrence_of"),
+         event.get("recurrence_id"),
+         event.get("source_project")
+    ) + image_params + (event.get("asana_task_gid"),))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+@partitioned_write
+def update_event(event):
+    """Update an existing event in the database based on asana_task_gid."""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    updated_id = execute_event_update(cur, event)
     conn.commit()
     cur.close()
     conn.close()
     event["id"] = updated_id
     return event
 
+@partitioned_write
+def update_events(events):
+    """Update a batch of events in a single transaction. Returns how many rows matched."""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    updated = 0
+    for event in events:
+        if execute_event_update(cur, event) is None:
+            print(f"[DEBUG] No hot row to update for {event.get('asana_task_gid')}")
+        else:
+            updated += 1
+    conn.commit()
+    cur.close()
+    conn.close()
+    return updated
+
+def delete_event(asana_task_gid, source_project=None):
+    """
+    Delete the event with the given asana_task_gid, only if it came from
+    `source_project` when one is given. Returns the number of rows removed.
+    """
+    conn = get_db_connection()
+    cur = conn.cursor()
+    if source_project is None:
+        cur.execute("DELETE FROM events WHERE asana_task_gid = %s", (asana_task_gid,))
+    else:
+        cur.execute("DELETE FROM events WHERE asana_task_gid = %s AND source_project = %s",
+                    (asana_task_gid, source_project))
+    deleted = cur.rowcount
+    conn.commit()
+    cur.close()
+    conn.close()
+    if not deleted:
+        # Rows in archived years live in events_archive and are left untouched
+        print(f"[DEBUG] No hot row deleted for {asana_task_gid}")
+    return deleted
+
 # --------------------------
 # Cancellation adjustment helper
 # --------------------------
@@ -358,27 +1615,212 @@ def truncate_title(raw_text, max_words=8):
     else:
         return " ".join(words[:max_words]) + "…"
 
+# --------------------------
+# Remote Image Cache
+# --------------------------
+# Remote fetches are remembered per normalized URL. Within IMAGE_CACHE_FRESH_SECONDS
+# a repeat costs nothing; after that it is revalidated with If-None-Match /
+# If-Modified-Since, so an unchanged image costs a 304. URLs answering 403/404
+# are not retried until their backoff (doubling per failure) expires.
+IMAGE_CACHE_FRESH_SECONDS = int(os.getenv("IMAGE_CACHE_FRESH_SECONDS", "3600"))
+IMAGE_CACHE_BACKOFF_SECONDS = int(os.getenv("IMAGE_CACHE_BACKOFF_SECONDS", "900"))
+IMAGE_CACHE_MAX_BACKOFF_SECONDS = int(os.getenv("IMAGE_CACHE_MAX_BACKOFF_SECONDS", str(7 * 24 * 3600)))
+
+def normalize_image_url(url):
+    """Canonical form of an image URL, used both for fetching and as the cache key."""
+    parts = urlsplit((url or "").strip())
+    netloc = parts.netloc.lower()
+    query = parts.query
+    if "dropbox.com" in netloc and "dl=0" in query:
+        query = query.replace("dl=0", "raw=1")
+    return urlunsplit((parts.scheme.lower(), netloc, parts.path, query, ""))
+
+def get_cached_image(url):
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT etag, last_modified, content, format, status, failures, fetched_at, retry_after
+        FROM image_cache WHERE url = %s
+    """, (url,))
+    row = cur.fetchone()
+    cur.close()
+    conn.close()
+    if not row:
+        return None
+    return {
+        "etag": row[0],
+        "last_modified": row[1],
+        "content": bytes(row[2]) if row[2] is not None else None,
+        "format": row[3],
+        "status": row[4],
+        "failures": row[5],
+        "fetched_at": row[6],
+        "retry_after": row[7]
+    }
+
+def store_cached_image(url, status, content=None, image_format=None, etag=None, last_modified=None,
+                       failures=0, retry_after=None):
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO image_cache (url, etag, last_modified, content_hash, content, format, status, failures,
+                                 fetched_at, retry_after)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, now(), %s)
+        ON CONFLICT (url) DO UPDATE SET
+            etag = EXCLUDED.etag,
+            last_modified = EXCLUDED.last_modified,
+            content_hash = EXCLUDED.content_hash,
+            content = EXCLUDED.content,
+            format = EXCLUDED.format,
+            status = EXCLUDED.status,
+            failures = EXCLUDED.failures,
+            fetched_at = EXCLUDED.fetched_at,
+            retry_after = EXCLUDED.retry_after
+    """, (
+        url, etag, last_modified,
+        hashlib.sha256(content).hexdigest() if content else None,
+        psycopg2.Binary(content) if content else None,
+        image_format, status, failures, retry_after
+    ))
+    conn.commit()
+    cur.close()
+    conn.close()
+
+def touch_cached_image(url):
+    """Mark a cached entry as just revalidated."""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("UPDATE image_cache SET fetched_at = now(), status = 200 WHERE url = %s", (url,))
+    conn.commit()
+    cur.close()
+    conn.close()
+
+# Downloads are streamed and abandoned as soon as they exceed IMAGE_MAX_BYTES or
+# announce a non-image Content-Type. Bodies that get through are decoded by Pillow
+# on a small worker pool, with decompression-bomb limits, before being accepted.
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(15 * 1024 * 1024)))
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", str(40_000_000)))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+IMAGE_VALIDATE_TIMEOUT = int(os.getenv("IMAGE_VALIDATE_TIMEOUT", "30"))
+Image.MAX_IMAGE_PIXELS = IMAGE_MAX_PIXELS
+_image_pool = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="image")
+
+class ImageRejected(Exception):
+    """A remote resource that is not an acceptable image."""
+
+def is_image_content_type(content_type):
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    # Some hosts serve images as generic binaries; Pillow has the final word on those.
+    return not content_type or content_type.startswith("image/") or \
+        content_type in ("application/octet-stream", "binary/octet-stream")
+
+def inspect_image(content):
+    """Fully decode `content` and return its format (e.g. "JPEG"). Raises ImageRejected."""
+    try:
+        with warnings.catch_warnings():
+            # Treat images over MAX_IMAGE_PIXELS as errors rather than warnings
+            warnings.simplefilter("error", Image.DecompressionBombWarning)
+            with Image.open(BytesIO(content)) as im:
+                im.load()
+                return im.format
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning) as e:
+        raise ImageRejected(f"image too large: {e}")
+    except Exception as e:
+        raise ImageRejected(f"not a valid image: {e}")
+
+def validate_image(content):
+    """Run inspect_image on the image worker pool."""
+    return _image_pool.submit(inspect_image, content).result(timeout=IMAGE_VALIDATE_TIMEOUT)
+
+def read_capped(resp, max_bytes=IMAGE_MAX_BYTES):
+    """Read a streamed response body, refusing anything over `max_bytes`."""
+    declared = resp.headers.get("Content-Length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise ImageRejected(f"Content-Length {declared} exceeds {max_bytes} bytes")
+    body = bytearray()
+    for chunk in resp.iter_content(chunk_size=64 * 1024):
+        body.extend(chunk)
+        if len(body) > max_bytes:
+            raise ImageRejected(f"body exceeds {max_bytes} bytes")
+    return bytes(body)
+
+def fetch_remote_image(url, headers=None, timeout=10):
+    """
+    Return (bytes, format) for the image at `url` through the image cache,
+    or (None, None) if unavailable. Network errors fall back to the last good
+    copy when there is one.
+    """
+    url = normalize_image_url(url)
+    if not url:
+        return None, None
+    cached = get_cached_image(url)
+    now = datetime.utcnow()
+    stale = (cached["content"], cached["format"]) if cached and cached["content"] else (None, None)
+    if cached:
+        if cached["retry_after"] and cached["retry_after"] > now:
+            print(f"[DEBUG] Image {url} failed recently ({cached['status']}), not retrying yet")
+            return None, None
+        if cached["content"] and cached["fetched_at"] and \
+                (now - cached["fetched_at"]).total_seconds() < IMAGE_CACHE_FRESH_SECONDS:
+            return stale
+
+    request_headers = dict(headers or {})
+    if cached and cached["content"]:
+        if cached["etag"]:
+            request_headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            request_headers["If-Modified-Since"] = cached["last_modified"]
+
+    def reject(status, reason):
+        failures = (cached["failures"] if cached else 0) + 1
+        backoff = min(IMAGE_CACHE_BACKOFF_SECONDS * 2 ** (failures - 1), IMAGE_CACHE_MAX_BACKOFF_SECONDS)
+        store_cached_image(url, status, failures=failures, retry_after=now + timedelta(seconds=backoff))
+        print(f"[DEBUG] Image {url} rejected ({reason}); backing off {backoff}s")
+        return None, None
+
+    try:
+        with requests.get(url, timeout=timeout, headers=request_headers, stream=True) as resp:
+            if resp.status_code == 304 and cached and cached["content"]:
+                touch_cached_image(url)
+                return stale
+            if resp.status_code in (403, 404, 410):
+                return reject(resp.status_code, f"HTTP {resp.status_code}")
+            if resp.status_code != 200:
+                print(f"[DEBUG] HTTP {resp.status_code} fetching image {url}")
+                return stale
+            if not is_image_content_type(resp.headers.get("Content-Type")):
+                return reject(415, f"Content-Type {resp.headers.get('Content-Type')}")
+            content = read_capped(resp)
+            etag = resp.headers.get("ETag")
+            last_modified = resp.headers.get("Last-Modified")
+        image_format = validate_image(content)
+    except ImageRejected as e:
+        return reject(415, str(e))
+    except requests.exceptions.RequestException as e:
+        print(f"[DEBUG] Error fetching image {url}: {e}")
+        return stale
+
+    store_cached_image(url, 200, content=content, image_format=image_format,
+                       etag=etag, last_modified=last_modified)
+    return content, image_format
+
 def download_image(url):
     """
-    Download image from `url` and return raw bytes.
-    Return None if there's any error or if the file is too small to be valid.
+    Download image from `url` and return (raw bytes, format).
+    Return (None, None) if there's any error or if the file isn't a valid image.
     """
     try:
         headers = {"User-Agent": "Mozilla/5.0"}
-        resp = requests.get(url, timeout=10, headers=headers)
-        resp.raise_for_status()
-        if len(resp.content) < 200:  # arbitrary minimal size check
-            return None
-        return resp.content
+        return fetch_remote_image(url, headers=headers, timeout=10)
     except:
-        return None
+        return None, None
 
 @app.route("/import_ics", methods=["GET", "POST"])
 def import_ics():
     if request.method == "GET":
         ics_url = request.args.get("url")
         if ics_url:
-            return process_ics_url(ics_url)
+            return job_accepted(enqueue_job("import_ics", {"url": ics_url}))
         else:
             return '''
                 <h2>Import ICS Calendar</h2>
@@ -392,155 +1834,509 @@ def import_ics():
         ics_url = request.form.get("ics_url")
         if not ics_url:
             return jsonify({"error": "Missing ICS URL"}), 400
-        return process_ics_url(ics_url)
+        return job_accepted(enqueue_job("import_ics", {"url": ics_url}))
 
 
-def process_ics_url(ics_url):
-    logs = []
-    try:
-        resp = requests.get(ics_url, timeout=15)
-        resp.raise_for_status()
-        ics_data = resp.text
-        logs.append(f"Downloaded ICS from: {ics_url}")
-
-        cal = icalendar.Calendar.from_ical(ics_data)
-        added_count = 0
-        skipped_count = 0
-
-        for component in cal.walk():
-            if component.name == "VEVENT":
-                uid = str(component.get('uid', ''))
-                if not uid:
-                    continue  # skip if no UID
-
-                # 1) ICS summary & description
-                raw_summary = str(component.get('summary', 'No Title'))
-                raw_description = str(component.get('description', ''))
-
-                # 2) Truncate summary for monthly cell
-                short_title = truncate_title(raw_summary, max_words=8)
-
-                # 3) If ICS description is empty, put leftover summary in description
-                if not raw_description.strip():
-                    # (We won't do leftover lines logic, just reuse the entire raw_summary)
-                    raw_description = raw_summary
-
-                # 4) Remove any leftover HTML from description
-                safe_desc = strip_images(sanitize_html(raw_description))
-
-                # 5) Parse dtstart / dtend
-                dtstart = component.get('dtstart').dt
-                if isinstance(dtstart, datetime):
-                    start_date = dtstart.strftime("%Y-%m-%d")
-                    start_time = dtstart.strftime("%H:%M")
-                else:
-                    start_date = dtstart.strftime("%Y-%m-%d")
-                    start_time = "00:00"
-
-                dtend = component.get('dtend')
-                if dtend:
-                    dtend_val = dtend.dt
-                    if isinstance(dtend_val, datetime):
-                        end_date = dtend_val.strftime("%Y-%m-%d")
-                        end_time = dtend_val.strftime("%H:%M")
-                    else:
-                        end_date = dtend_val.strftime("%Y-%m-%d")
-                        end_time = "00:00"
-                else:
-                    # default 1 hour after start
-                    if isinstance(dtstart, datetime):
-                        dtend_val = dtstart + timedelta(hours=1)
-                    else:
-                        dtend_val = datetime.combine(dtstart, datetime.min.time()) + timedelta(hours=1)
-                    end_date = dtend_val.strftime("%Y-%m-%d")
-                    end_time = dtend_val.strftime("%H:%M")
-
-                # 6) Extract image URL from ICS property like X-WP-IMAGES-URL
-                image_url = component.get('X-WP-IMAGES-URL')
-                if image_url:
-                    image_url = str(image_url)
-                else:
-                    image_url = ""
-
-                # 7) Download the image if found
-                image_data = None
-                if image_url.strip():
-                    logs.append(f"Found image URL for UID {uid}: {image_url}")
-                    downloaded = download_image(image_url)
-                    if downloaded:
-                        image_data = psycopg2.Binary(downloaded)
+def ics_naive(value, tzinfo=None):
+    """
+    Wall-clock naive datetime for an ICS date/datetime, as stored in events.
+    Aware values are first moved into `tzinfo` (the series' DTSTART zone).
+    """
+    if isinstance(value, datetime):
+        if value.tzinfo and tzinfo:
+            value = value.astimezone(tzinfo)
+        return value.replace(tzinfo=None)
+    return datetime.combine(value, datetime.min.time())
+
+def ics_date_list(component, name, tzinfo=None):
+    """Flatten EXDATE/RDATE properties (which may repeat) into naive datetimes."""
+    prop = component.get(name)
+    if prop is None:
+        return []
+    values = []
+    for item in prop if isinstance(prop, list) else [prop]:
+        for dt in getattr(item, "dts", []):
+            value = dt.dt
+            if isinstance(value, tuple):
+                # RDATE;VALUE=PERIOD gives (start, end or duration); the occurrence starts at start
+                value = value[0]
+            values.append(ics_naive(value, tzinfo))
+    return values
+
+def ics_component_to_event(component):
+    """Turn one VEVENT into an event dictionary, or None if it has no UID."""
+    uid = str(component.get('uid', ''))
+    if not uid:
+        return None  # skip if no UID
+
+    # 1) ICS summary & description
+    raw_summary = str(component.get('summary', 'No Title'))
+    raw_description = str(component.get('description', ''))
+
+    # 2) Truncate summary for monthly cell
+    short_title = truncate_title(raw_summary, max_words=8)
+
+    # 3) If ICS description is empty, put leftover summary in description
+    if not raw_description.strip():
+        # (We won't do leftover lines logic, just reuse the entire raw_summary)
+        raw_description = raw_summary
+
+    # 4) Remove any leftover HTML from description
+    safe_desc = strip_images(sanitize_html(raw_description))
+
+    # 5) Parse dtstart / dtend
+    dtstart = component.get('dtstart').dt
+    if isinstance(dtstart, datetime):
+        start_date = dtstart.strftime("%Y-%m-%d")
+        start_time = dtstart.strftime("%H:%M")
+    else:
+        start_date = dtstart.strftime("%Y-%m-%d")
+        start_time = "00:00"
+
+    dtend = component.get('dtend')
+    if dtend:
+        dtend_val = dtend.dt
+        if isinstance(dtend_val, datetime):
+            end_date = dtend_val.strftime("%Y-%m-%d")
+            end_time = dtend_val.strftime("%H:%M")
+        else:
+            end_date = dtend_val.strftime("%Y-%m-%d")
+            end_time = "00:00"
+    else:
+        # default 1 hour after start
+        if isinstance(dtstart, datetime):
+            dtend_val = dtstart + timedelta(hours=1)
+        else:
+            dtend_val = datetime.combine(dtstart, datetime.min.time()) + timedelta(hours=1)
+        end_date = dtend_val.strftime("%Y-%m-%d")
+        end_time = dtend_val.strftime("%H:%M")
+
+    # 6) Extract image URL from ICS property like X-WP-IMAGES-URL
+    image_url = component.get('X-WP-IMAGES-URL')
+    if image_url:
+        image_url = str(image_url)
+    else:
+        image_url = ""
+
+    # 7) Build final event (the image is downloaded later, only if needed)
+    new_event = {
+        "asana_task_gid": uid,
+        "event_status": "Imported",
+        "ministry": "",
+        "organizer": "ICS Import",
+        "website_trigger": "Publish",
+        "registration": "",
+        "title": short_title,  # monthly cell sees only this short title
+        "start_date": start_date,
+        "start_time": start_time,
+        "end_date": end_date,
+        "end_time": end_time,
+        "location": str(component.get('location', '')),
+        "description": safe_desc,  # tooltip / modal
+        "image": image_url,         # store the raw image URL
+        "image_url": image_url,
+        "image_data": None
+    }
+
+    # 8) Recurrence: a RECURRENCE-ID marks an overridden instance of a series,
+    #    an RRULE/RDATE makes this the series master.
+    tzinfo = dtstart.tzinfo if isinstance(dtstart, datetime) else None
+    recurrence_id = component.get('recurrence-id')
+    if recurrence_id:
+        original_start = ics_naive(recurrence_id.dt, tzinfo)
+        new_event["asana_task_gid"] = f"{uid}#{original_start.strftime('%Y%m%dT%H%M%S')}"
+        new_event["recurrence_of"] = uid
+        new_event["recurrence_id"] = original_start
+        # A cancelled instance only removes its occurrence from the series
+        new_event["cancelled"] = str(component.get('status', '')).upper() == "CANCELLED"
+    elif component.get('rrule') or component.get('rdate'):
+        recur = icalendar.vRecur(component.get('rrule') or {"FREQ": ["YEARLY"], "COUNT": [1]})
+        if "UNTIL" in recur:
+            recur["UNTIL"] = [ics_naive(until, tzinfo) if isinstance(until, datetime) else
+                              datetime.combine(until, datetime.max.time().replace(microsecond=0))
+                              for until in recur["UNTIL"]]
+        first_start = ics_naive(dtstart, tzinfo)
+        new_event["rrule"] = recur.to_ical().decode("utf-8")
+        new_event["rdates"] = ics_date_list(component, 'rdate', tzinfo)
+        new_event["exdates"] = ics_date_list(component, 'exdate', tzinfo)
+        new_event["series_until"] = series_until_date(new_event["rrule"], first_start, new_event["rdates"])
+    return new_event
+
+def link_series_overrides(events):
+    """
+    Exclude overridden instances from their series' expansion via its exdates.
+    Returns the events to store (cancelled instances are dropped).
+    """
+    masters = {event["asana_task_gid"]: event for event in events if event.get("rrule")}
+    for event in events:
+        master = masters.get(event.get("recurrence_of"))
+        if master and event["recurrence_id"] not in master["exdates"]:
+            master["exdates"].append(event["recurrence_id"])
+    return [event for event in events if not event.get("cancelled")]
+
+ICS_IMPORT_BATCH_SIZE = int(os.getenv("ICS_IMPORT_BATCH_SIZE", "200"))
+
+def unfold_ics_lines(raw_lines):
+    """Join folded continuation lines (RFC 5545 section 3.1) and decode each content line."""
+    current = None
+    for raw in raw_lines:
+        if not raw:
+            continue
+        if raw[:1] in (b" ", b"\t") and current is not None:
+            current += raw[1:]
+            continue
+        if current is not None:
+            yield current.decode("utf-8", errors="replace")
+        current = raw
+    if current is not None:
+        yield current.decode("utf-8", errors="replace")
+
+def iter_ics_events(raw_lines):
+    """
+    Yield a feed's VEVENTs one at a time from an iterator of raw lines.
+    Only the component being read is held in memory; VTIMEZONEs are parsed as
+    they go by so later events resolve their TZIDs. Raises ValueError if the
+    stream isn't a calendar.
+    """
+    started = False
+    block = None
+    depth = 0
+    for line in unfold_ics_lines(raw_lines):
+        marker = line.strip().upper()
+        if not started:
+            if marker != "BEGIN:VCALENDAR":
+                raise ValueError("Not an ICS feed (no BEGIN:VCALENDAR)")
+            started = True
+            continue
+        if block is None:
+            if marker in ("BEGIN:VEVENT", "BEGIN:VTIMEZONE"):
+                block, depth = [line], 1
+            continue
+        block.append(line)
+        if marker.startswith("BEGIN:"):
+            depth += 1
+        elif marker.startswith("END:"):
+            depth -= 1
+            if depth == 0:
+                text = "\r\n".join(block) + "\r\n"
+                kind, block = block[0].strip().upper()[6:], None
+                try:
+                    if kind == "VTIMEZONE":
+                        icalendar.Timezone.from_ical(text)
                     else:
-                        logs.append(f"Failed to download or invalid image for {image_url}")
-                        image_url = ""  # reset if invalid
-
-                # 8) Build final event
-                new_event = {
-                    "asana_task_gid": uid,
-                    "event_status": "Imported",
-                    "ministry": "",
-                    "organizer": "ICS Import",
-                    "website_trigger": "Publish",
-                    "registration": "",
-                    "title": short_title,  # monthly cell sees only this short title
-                    "start_date": start_date,
-                    "start_time": start_time,
-                    "end_date": end_date,
-                    "end_time": end_time,
-                    "location": str(component.get('location', '')),
-                    "description": safe_desc,  # tooltip / modal
-                    "image": image_url,         # store the raw image URL
-                    "image_url": image_url,
-                    "image_data": image_data
-                }
+                        yield icalendar.Event.from_ical(text)
+                except ValueError as e:
+                    print(f"[DEBUG] Skipping unparsable {kind}: {e}")
 
-                # 9) Insert or skip if exists
-                if not event_exists(uid):
-                    add_event(new_event)
-                    added_count += 1
-                    logs.append(f"Added event: {short_title}")
-                else:
-                    skipped_count += 1
-                    logs.append(f"Skipped existing event: {short_title}")
+def write_ics_batch(events, counts, log):
+    """Diff one batch of imported events, fetch images for the new/changed ones and store them."""
+    new, changed, skipped_count = diff_events(events)
+    for new_event in new + changed:
+        if not needs_image_download(new_event):
+            continue
+        image_url = new_event["image_url"]
+        log(f"Found image URL for UID {new_event['asana_task_gid']}: {image_url}")
+        downloaded, image_format = download_image(image_url)
+        if downloaded:
+            new_event["image_data"] = psycopg2.Binary(downloaded)
+            new_event["image_format"] = image_format
+        else:
+            log(f"Failed to download or invalid image for {image_url}")
+            new_event["image"] = ""  # don't display an invalid image
+    updated = 0
+    if new:
+        add_events(new)
+    if changed:
+        updated = update_events(changed)
+    for ev in new:
+        log(f"Added event: {ev['title']}")
+    for ev in changed:
+        log(f"Updated event: {ev['title']}")
+    counts["added"] += len(new)
+    counts["updated"] += updated
+    counts["unchanged"] += skipped_count
 
-        logs.append(f"Import complete. Added={added_count}, Skipped={skipped_count}.")
-        return "<pre>" + "\n".join(logs) + "</pre>"
-    except Exception as e:
-        logs.append("Error: " + str(e))
-        return "<pre>" + "\n".join(logs) + "</pre>", 500
+def import_ics_feed(ics_url, log=print):
+    """
+    Import an ICS feed: insert new events, update changed ones, skip the rest.
+    The feed is parsed as it downloads and stored in batches, one batch being
+    written while the next is read; recurring series are held back until the
+    end so overrides can be linked to their masters.
+    Progress goes to `log`; failures raise. Returns the counts.
+    """
+    counts = {"added": 0, "updated": 0, "unchanged": 0}
+    series = []
+    batch = []
+    seen_gids = set()
+    with requests.get(ics_url, timeout=15, stream=True) as resp:
+        resp.raise_for_status()
+        log(f"Downloading ICS from: {ics_url}")
+        with ThreadPoolExecutor(max_workers=1) as writer:
+            writing = None
+            for component in iter_ics_events(resp.iter_lines()):
+                new_event = ics_component_to_event(component)
+                if not new_event or new_event["asana_task_gid"] in seen_gids:
+                    continue  # no UID, or a repeated VEVENT (first one wins)
+                seen_gids.add(new_event["asana_task_gid"])
+                if new_event.get("rrule") or new_event.get("recurrence_of"):
+                    series.append(new_event)
+                    continue
+                batch.append(new_event)
+                if len(batch) >= ICS_IMPORT_BATCH_SIZE:
+                    if writing:
+                        writing.result()
+                    writing = writer.submit(write_ics_batch, batch, counts, log)
+                    batch = []
+            if writing:
+                writing.result()
+    write_ics_batch(batch + link_series_overrides(series), counts, log)
+
+    log(f"Import complete. Added={counts['added']}, Updated={counts['updated']}, "
+        f"Unchanged={counts['unchanged']}.")
+    return counts
     
 
 # --------------------------
 # Asana Functions
 # --------------------------
-async def fetch_tasks_from_asana():
-    bearer_token = os.getenv('ASANA_TOKEN')
-    project_gid = os.getenv('ASANA_DEMO_PROJECT_ID')
-    if not bearer_token or not project_gid:
-        print("ASANA_TOKEN or ASANA_DEMO_PROJECT_ID not set.")
-        return []
-    asana_url = f"https://app.asana.com/api/1.0/projects/{project_gid}/tasks"
-    headers = {
-        "accept": "application/json",
-        "authorization": f"Bearer {bearer_token}"
+# Overridable so the sync can be pointed at a local stand-in.
+ASANA_API_BASE = os.getenv("ASANA_API_BASE", "https://app.asana.com/api/1.0").rstrip("/")
+ASANA_MAX_CONCURRENCY = int(os.getenv("ASANA_MAX_CONCURRENCY", "8"))
+ASANA_MAX_RETRIES = int(os.getenv("ASANA_MAX_RETRIES", "6"))
+ASANA_BACKOFF_SECONDS = float(os.getenv("ASANA_BACKOFF_SECONDS", "1"))
+ASANA_BACKOFF_MAX_SECONDS = float(os.getenv("ASANA_BACKOFF_MAX_SECONDS", "60"))
+
+# Only the fields asana_task_to_event reads, per kind of request.
+ASANA_OPT_FIELDS = {
+    # Listing a project's tasks, plus its projects to pick one owner for multi-homed tasks.
+    "project_tasks": "name,due_on,custom_fields.name,custom_fields.display_value,projects.gid",
+    # Webhook re-fetches by gid: the projects also tell whether the task is still one of ours.
+    "task_batch": "name,due_on,custom_fields.name,custom_fields.display_value,projects.gid",
+}
+
+class AsanaClient:
+    """
+    Long-lived Asana API client shared by every sync, so connections stay open between runs.
+
+    Requests share a concurrency limit that halves on a 429 (or when the rate-limit
+    headers say the quota is nearly spent) and grows back by one after a run of
+    successes. A 429 pauses all requests for its Retry-After; 5xx responses and
+    transport errors are retried with jittered exponential backoff.
+    """
+
+    def __init__(self, base_url, max_concurrency=ASANA_MAX_CONCURRENCY):
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.limit = max_concurrency
+        self.in_flight = 0
+        self.successes = 0
+        self.resume_at = 0.0
+        self._http = None
+        self._slots = None
+
+    def _client(self):
+        if self._http is None:
+            limits = httpx.Limits(max_connections=self.max_concurrency,
+                                  max_keepalive_connections=self.max_concurrency)
+            self._http = httpx.AsyncClient(base_url=self.base_url, timeout=30, limits=limits)
+            self._slots = asyncio.Condition()
+        return self._http
+
+    async def _acquire(self):
+        delay = self.resume_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        async with self._slots:
+            await self._slots.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def _release(self):
+        async with self._slots:
+            self.in_flight -= 1
+            self._slots.notify_all()
+
+    def _throttle(self):
+        self.limit = max(1, self.limit // 2)
+        self.successes = 0
+
+    def _observe(self, response):
+        """Adjust the concurrency limit from a successful response's rate-limit headers."""
+        try:
+            remaining = int(response.headers["X-RateLimit-Remaining"])
+            quota = int(response.headers["X-RateLimit-Limit"])
+            if remaining < quota * 0.1:
+                self._throttle()
+                return
+        except (KeyError, ValueError):
+            pass
+        self.successes += 1
+        if self.successes >= self.limit and self.limit < self.max_concurrency:
+            self.limit += 1
+            self.successes = 0
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(ASANA_BACKOFF_MAX_SECONDS, ASANA_BACKOFF_SECONDS * 2 ** attempt))
+
+    async def request(self, method, path, **kwargs):
+        """Send one API request, retrying throttled and failed attempts. Raises once retries run out."""
+        client = self._client()
+        headers = {
+            "accept": "application/json",
+            "authorization": f"Bearer {os.getenv('ASANA_TOKEN')}"
+        }
+        for attempt in range(ASANA_MAX_RETRIES + 1):
+            await self._acquire()
+            error = None
+            try:
+                response = await client.request(method, path, headers=headers, **kwargs)
+            except httpx.TransportError as e:
+                response, error = None, e
+            finally:
+                await self._release()
+
+            if response is not None and response.status_code != 429 and response.status_code < 500:
+                self._observe(response)
+                response.raise_for_status()
+                return response
+            if attempt == ASANA_MAX_RETRIES:
+                break
+            if response is not None and response.status_code == 429:
+                try:
+                    retry_after = float(response.headers.get("Retry-After", ""))
+                except ValueError:
+                    retry_after = self.backoff(attempt)
+                self.resume_at = max(self.resume_at, time.monotonic() + retry_after)
+                self._throttle()
+                print(f"[DEBUG] Asana rate limited {method} {path}; pausing {retry_after:.1f}s, "
+                      f"concurrency now {self.limit}")
+                # Spread the resumed requests out instead of releasing them all at once
+                await asyncio.sleep(random.uniform(0, ASANA_BACKOFF_SECONDS))
+            else:
+                wait = self.backoff(attempt)
+                reason = error if error else f"HTTP {response.status_code}"
+                print(f"[DEBUG] Asana {method} {path} failed ({reason}); retry {attempt + 1} in {wait:.1f}s")
+                await asyncio.sleep(wait)
+        if error:
+            raise error
+        response.raise_for_status()
+
+asana_client = AsanaClient(ASANA_API_BASE)
+_asana_loop = None
+_asana_loop_lock = threading.Lock()
+
+def run_asana(coro):
+    """
+    Run a coroutine on the long-lived Asana event loop and wait for its result.
+    asyncio.run would start a new loop per sync, and the client's pooled
+    connections belong to the loop that opened them.
+    """
+    global _asana_loop
+    with _asana_loop_lock:
+        if _asana_loop is None:
+            _asana_loop = asyncio.new_event_loop()
+            threading.Thread(target=_asana_loop.run_forever, name="asana-client", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coro, _asana_loop).result()
+
+# Custom field read for each event field; a project's "fields" overrides any of these.
+ASANA_FIELD_MAP = {
+    "event_status": "Event Status",
+    "ministry": "Ministry",
+    "website_trigger": "Website Trigger",
+    "registration": "Registration",
+    "description": "Content",
+    "image": "Graphics",
+    "location": "Locations",
+}
+
+def asana_project(gid, name=None, fields=None, ministry=""):
+    return {
+        "gid": str(gid),
+        "name": name or str(gid),
+        "fields": {**ASANA_FIELD_MAP, **(fields or {})},
+        "ministry": ministry,
     }
+
+def load_asana_projects():
+    """
+    The Asana projects to sync, as {gid: project}. ASANA_PROJECTS is a JSON list of
+    project gids or {"gid", "name", "fields", "ministry"} objects, where "fields" maps
+    event fields to custom field names and "ministry" is used when that field is
+    empty. Without it, the single ASANA_DEMO_PROJECT_ID is synced.
+    """
+    configured = os.getenv("ASANA_PROJECTS")
+    if not configured:
+        project_gid = os.getenv('ASANA_DEMO_PROJECT_ID')
+        return {project_gid: asana_project(project_gid)} if project_gid else {}
+    projects = {}
+    for entry in json.loads(configured):
+        if not isinstance(entry, dict):
+            entry = {"gid": entry}
+        project = asana_project(entry["gid"], entry.get("name"), entry.get("fields"), entry.get("ministry", ""))
+        projects[project["gid"]] = project
+    return projects
+
+def asana_task_owner(task, projects):
+    """
+    The first of `projects` the task belongs to, or None. A task multi-homed in
+    several configured projects is synced (and tagged) by that one only.
+    """
+    member_of = {p.get("gid") for p in task.get("projects", [])}
+    return next((gid for gid in projects if gid in member_of), None)
+
+async def iter_asana_task_pages(project_gid):
+    """Yield the project's tasks one API page at a time."""
+    if not os.getenv('ASANA_TOKEN'):
+        print("ASANA_TOKEN not set.")
+        return
     params = {
         "limit": 100,
-        "opt_fields": "name,projects.gid,projects.name,custom_fields.gid,custom_fields.name,custom_fields.display_value,due_on"
+        "opt_fields": ASANA_OPT_FIELDS["project_tasks"]
     }
-    all_tasks = []
-    async with httpx.AsyncClient() as client:
-        while True:
-            response = await client.get(asana_url, headers=headers, params=params)
-            response.raise_for_status()
-            data = response.json()
-            tasks = data.get("data", [])
-            all_tasks.extend(tasks)
-            next_page = data.get("next_page")
-            if next_page and next_page.get("offset"):
-                params["offset"] = next_page["offset"]
+    while True:
+        response = await asana_client.request("GET", f"/projects/{project_gid}/tasks", params=params)
+        data = response.json()
+        yield data.get("data", [])
+        next_page = data.get("next_page")
+        if next_page and next_page.get("offset"):
+            params["offset"] = next_page["offset"]
+        else:
+            break
+
+ASANA_BATCH_SIZE = 10  # maximum number of actions Asana accepts per /batch request
+
+async def fetch_asana_tasks_by_gid(task_gids):
+    """
+    Fetch specific tasks through Asana's batch API, ten per request, several requests at once.
+    Returns (tasks, missing_gids) where missing_gids are tasks Asana reports as gone.
+    """
+    if not os.getenv('ASANA_TOKEN'):
+        print("ASANA_TOKEN not set.")
+        return [], []
+    task_gids = list(task_gids)
+    fields = ASANA_OPT_FIELDS["task_batch"].split(",")
+
+    async def fetch_chunk(chunk):
+        actions = [{
+            "method": "get",
+            "relative_path": f"/tasks/{gid}",
+            "options": {"fields": fields}
+        } for gid in chunk]
+        response = await asana_client.request("POST", "/batch", json={"data": {"actions": actions}})
+        return zip(chunk, response.json().get("data", []))
+
+    chunks = [task_gids[i:i + ASANA_BATCH_SIZE] for i in range(0, len(task_gids), ASANA_BATCH_SIZE)]
+    tasks = []
+    missing = []
+    for results in await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks)):
+        for gid, result in results:
+            status = result.get("status_code")
+            if status == 200:
+                tasks.append(result.get("body", {}).get("data", {}))
+            elif status in (403, 404):
+                missing.append(gid)
             else:
-                break
-    return all_tasks
+                print(f"[DEBUG] Batch fetch of task {gid} returned {status}")
+    return tasks, missing
 
 def sanitize_html(html_content):
     """Sanitize HTML content to remove dangerous tags and attributes."""
@@ -561,161 +2357,929 @@ def sanitize_html(html_content):
     
     return str(soup)
 
-def process_asana_tasks():
+def get_placeholder_image():
+    """Image stored when a referenced graphic can't be fetched (none for now)."""
+    return None
+
+def custom_field_map(task):
+    """Index a task's custom fields by name once, instead of scanning the list per field."""
+    fields = {}
+    for cf in task.get("custom_fields", []):
+        # First occurrence wins, matching the old linear lookup.
+        fields.setdefault(cf.get("name"), cf.get("display_value") or "")
+    return fields
+
+def download_asana_image(image):
+    """
+    Download an image referenced from an Asana task, falling back to the placeholder.
+    Returns (bytes, format).
+    """
+    try:
+        print(f"[DEBUG] Downloading image from {image}")
+        # Add a user-agent header to mimic a browser
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        }
+        image_data, image_format = fetch_remote_image(image, headers=headers, timeout=15)
+        if image_data is None:
+            print(f"[DEBUG] Image unavailable: {image}. Using placeholder.")
+            return get_placeholder_image(), None
+        print(f"[DEBUG] Got {image_format} image: {len(image_data)} bytes")
+        return image_data, image_format
+    except Exception as e:
+        print(f"[DEBUG] Error downloading image: {e}")
+        return get_placeholder_image(), None
+
+def asana_task_to_event(task, project):
+    """Map a task of `project` onto an event dictionary (without downloading its image)."""
+    asana_task_gid = task.get("gid")
+    title = task.get("name", "Unnamed Task")
+    due_on = task.get("due_on")
+    start_date = due_on if due_on else datetime.now().strftime("%Y-%m-%d")
+    start_time = "09:00"
+    end_time = "10:00"
+    cf = custom_field_map(task)
+    fields = project["fields"]
+    
+    event_status    = cf.get(fields["event_status"]) or "Approved"
+    ministry        = cf.get(fields["ministry"]) or project["ministry"]
+    organizer       = ministry or "Asana Import"
+    website_trigger = cf.get(fields["website_trigger"]) or "Publish"
+    registration    = cf.get(fields["registration"]) or ""
+    description     = cf.get(fields["description"]) or title
+    
+    # Apply HTML sanitization AFTER description is defined
+    description = sanitize_html(description)
+    
+    image           = cf.get(fields["image"]) or ""
+    location        = cf.get(fields["location"]) or ""
+    
+    if image:
+        image = normalize_image_url(image)
+    
+    location = location.strip()
+    if location.startswith("17 -"):
+        location = "17 Smith Street"
+    elif location.startswith("163"):
+        location = "163 Livingston Street"
+    elif location.startswith("392"):
+        location = "392 Fulton Street"
+    elif location.startswith("190"):
+        location = "190 Livingston Street"
+    
+    new_event = {
+        "asana_task_gid": asana_task_gid,
+        "event_status": event_status,
+        "ministry": ministry,
+        "organizer": organizer,
+        "website_trigger": website_trigger,
+        "registration": registration,
+        "title": title,
+        "start_date": start_date,
+        "start_time": start_time,
+        "end_date": start_date,
+        "end_time": end_time,
+        "location": location,
+        "description": description,
+        "image": image,
+        "image_url": image,
+        "image_data": None,
+        "source_project": project["gid"]
+    }
+    return adjust_for_cancellation(new_event)
+
+# The sync runs as a chain of async generator stages (pages -> events -> images -> DB).
+# Stages are joined by bounded queues, so each starts as soon as the first page arrives
+# and a slow stage holds back the ones before it; at most a few pages are ever in memory.
+ASANA_PIPELINE_BUFFER = int(os.getenv("ASANA_PIPELINE_BUFFER", "2"))
+ASANA_IMAGE_CONCURRENCY = int(os.getenv("ASANA_IMAGE_CONCURRENCY", "4"))
+_PIPELINE_DONE = object()
+
+async def buffered(source, maxsize=ASANA_PIPELINE_BUFFER):
+    """Run `source` in its own task, handing items over through a queue of `maxsize`."""
+    queue = asyncio.Queue(maxsize)
+
+    async def pump():
+        try:
+            async for item in source:
+                await queue.put((item, None))
+            await queue.put((_PIPELINE_DONE, None))
+        except Exception as e:
+            await queue.put((_PIPELINE_DONE, e))
+
+    producer = asyncio.create_task(pump())
+    try:
+        while True:
+            item, error = await queue.get()
+            if error:
+                raise error
+            if item is _PIPELINE_DONE:
+                break
+            yield item
+    finally:
+        producer.cancel()
+
+async def transform_asana_pages(pages, project, projects, stats):
+    """Turn each page of tasks into (new, changed) event batches for the current year."""
+    current_year = datetime.now().year
+    async for tasks in pages:
+        tasks = [task for task in tasks if task.get("gid")]
+        stats["fetched"] += len(tasks)
+        events, undated = [], set()
+        for task in tasks:
+            if "projects" in task and asana_task_owner(task, projects) != project["gid"]:
+                stats["skipped"] += 1
+                continue
+            if not task.get("due_on"):
+                undated.add(task["gid"])
+            new_event = asana_task_to_event(task, project)
+            # Skip events not in the current year
+            try:
+                event_year = datetime.strptime(new_event["start_date"], "%Y-%m-%d").year
+                if event_year != current_year:
+                    print(f"[DEBUG] Skipping event {task.get('name')} from year {event_year}")
+                    stats["skipped"] += 1
+                    continue
+            except ValueError:
+                print(f"[DEBUG] Couldn't parse date for event {task.get('name')}, using default")
+            events.append(new_event)
+        await asyncio.to_thread(keep_first_seen_dates, events, undated)
+        new, changed, unchanged = await asyncio.to_thread(diff_events, events)
+        stats["unchanged"] += unchanged
+        yield new, changed
+
+_asana_image_slots = None
+
+async def fetch_event_images(batches):
+    """
+    Download each batch's new or re-pointed images concurrently before passing the batch on.
+    The ASANA_IMAGE_CONCURRENCY slots are shared by every project syncing at the time.
+    """
+    global _asana_image_slots
+    if _asana_image_slots is None:
+        _asana_image_slots = asyncio.Semaphore(ASANA_IMAGE_CONCURRENCY)
+
+    async def fetch(event):
+        async with _asana_image_slots:
+            event["image_data"], event["image_format"] = await asyncio.to_thread(download_asana_image, event["image"])
+
+    async for new, changed in batches:
+        await asyncio.gather(*(fetch(event) for event in new + changed if needs_image_download(event)))
+        yield new, changed
+
+async def write_event_batches(batches, stats):
+    async for new, changed in batches:
+        if new:
+            await asyncio.to_thread(add_events, new)
+            stats["added"] += len(new)
+            print(f"[DEBUG] Inserted {len(new)} events")
+        if changed:
+            updated = await asyncio.to_thread(update_events, changed)
+            stats["updated"] += updated
+            print(f"[DEBUG] Updated {updated} events")
+
+async def run_asana_sync(project, projects):
+    stats = {"fetched": 0, "added": 0, "updated": 0, "unchanged": 0, "skipped": 0}
+    pages = buffered(iter_asana_task_pages(project["gid"]))
+    events = buffered(transform_asana_pages(pages, project, projects, stats))
+    with_images = buffered(fetch_event_images(events))
+    await write_event_batches(with_images, stats)
+    return stats
+
+def record_asana_sync_state(project_gid, started_at, stats=None, error=None):
+    """Save the outcome of one project's sync; failures count up until the next success."""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO asana_sync_state (project_gid, last_started_at, last_success_at, last_stats, last_error, failures)
+        VALUES (%s, %s, CASE WHEN %s IS NULL THEN now() END, %s, %s, CASE WHEN %s IS NULL THEN 0 ELSE 1 END)
+        ON CONFLICT (project_gid) DO UPDATE SET
+            last_started_at = EXCLUDED.last_started_at,
+            last_success_at = coalesce(EXCLUDED.last_success_at, asana_sync_state.last_success_at),
+            last_stats = coalesce(EXCLUDED.last_stats, asana_sync_state.last_stats),
+            last_error = EXCLUDED.last_error,
+            failures = CASE WHEN EXCLUDED.last_error IS NULL THEN 0 ELSE asana_sync_state.failures + 1 END
+    """, (project_gid, started_at, error, json.dumps(stats) if stats else None, error, error))
+    conn.commit()
+    cur.close()
+    conn.close()
+
+async def run_asana_projects():
+    """
+    Sync every configured project at once; they share the Asana client's connection
+    and rate budget, so the tick takes about as long as the slowest project.
+    Returns {project_gid: stats}, with {"error": ...} for projects that failed.
+    """
+    async def sync_project(project):
+        started_at = datetime.now()
+        try:
+            stats = await run_asana_sync(project, configured)
+        except Exception as e:
+            print(f"[DEBUG] Asana sync of project {project['name']} failed: {e}")
+            await asyncio.to_thread(record_asana_sync_state, project["gid"], started_at, error=str(e))
+            return {"error": str(e)}
+        print(f"[DEBUG] Asana sync of {project['name']} complete. Fetched: {stats['fetched']}, "
+              f"Added: {stats['added']}, Updated: {stats['updated']}, Unchanged: {stats['unchanged']}, "
+              f"Skipped: {stats['skipped']}")
+        await asyncio.to_thread(record_asana_sync_state, project["gid"], started_at, stats)
+        return stats
+
+    configured = load_asana_projects()
+    projects = list(configured.values())
+    if not projects:
+        print("No Asana projects configured (ASANA_PROJECTS or ASANA_DEMO_PROJECT_ID).")
+    results = await asyncio.gather(*(sync_project(project) for project in projects))
+    return {project["gid"]: result for project, result in zip(projects, results)}
+
+def process_asana_tasks():
+    try:
+        run_asana(run_asana_projects())
+    except Exception as e:
+        print("Error processing Asana tasks:", e)
+
+@app.cli.command("asana-projects")
+def asana_projects_command():
+    """List the configured Asana projects with their last sync outcome."""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT project_gid, last_started_at, last_success_at, last_stats, last_error, failures FROM asana_sync_state")
+    state = {row[0]: row[1:] for row in cur.fetchall()}
+    cur.close()
+    conn.close()
+    for gid, project in load_asana_projects().items():
+        started_at, success_at, stats, error, failures = state.get(gid, (None, None, None, None, 0))
+        print(f"{gid} ({project['name']}): last run {started_at or 'never'}, last success {success_at or 'never'}")
+        if stats:
+            print(f"    {stats}")
+        if error:
+            print(f"    failing ({failures} in a row): {error}")
+
+
+# --------------------------
+# Asana Webhooks
+# --------------------------
+# Webhooks push task changes as they happen; polling becomes a slow reconcile.
+ASANA_POLL_SECONDS = int(os.getenv("ASANA_POLL_SECONDS", "60"))
+ASANA_RECONCILE_SECONDS = int(os.getenv("ASANA_RECONCILE_SECONDS", "900"))
+ASANA_WEBHOOK_DEBOUNCE_SECONDS = float(os.getenv("ASANA_WEBHOOK_DEBOUNCE_SECONDS", "5"))
+ASANA_WEBHOOK_MAX_DELAY_SECONDS = float(os.getenv("ASANA_WEBHOOK_MAX_DELAY_SECONDS", "30"))
+
+_webhook_secrets = {}
+_webhook_lock = threading.Lock()
+_webhook_flush_lock = threading.Lock()
+_webhook_pending = {}
+_webhook_timer = None
+_webhook_first_at = None
+_scheduler = None
+
+ASANA_HANDSHAKE_WINDOW_SECONDS = int(os.getenv("ASANA_HANDSHAKE_WINDOW_SECONDS", "60"))
+
+def expect_asana_webhook_handshake(target):
+    """Replace any webhook stored for `target` by a pending one that accepts a handshake for a short while."""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("DELETE FROM asana_webhooks WHERE target = %s", (target,))
+    cur.execute("""
+        INSERT INTO asana_webhooks (target, secret, pending_until)
+        VALUES (%s, NULL, now() + %s * interval '1 second')
+    """, (target, ASANA_HANDSHAKE_WINDOW_SECONDS))
+    conn.commit()
+    cur.close()
+    conn.close()
+    _webhook_secrets.pop(target, None)
+
+def end_asana_webhook_registration(target):
+    """Close the handshake window; drop the row if no handshake arrived."""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("DELETE FROM asana_webhooks WHERE target = %s AND secret IS NULL", (target,))
+    cur.execute("UPDATE asana_webhooks SET pending_until = NULL WHERE target = %s", (target,))
+    conn.commit()
+    cur.close()
+    conn.close()
+
+def save_asana_webhook_secret(target, secret):
+    """
+    Store the handshake secret for `target`. Returns False unless a registration
+    for it is in flight (see asana-webhook-register) and has no secret yet.
+    """
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        UPDATE asana_webhooks SET secret = %s, pending_until = NULL
+        WHERE target = %s AND secret IS NULL AND pending_until > now()
+    """, (secret, target))
+    stored = cur.rowcount == 1
+    conn.commit()
+    cur.close()
+    conn.close()
+    if stored:
+        _webhook_secrets[target] = secret
+    return stored
+
+def get_asana_webhook_secret(target, refresh=False):
+    """
+    The handshake secret for `target`, cached per process. Another worker may have
+    re-registered the webhook since, so `refresh` re-reads it from the database.
+    """
+    if refresh:
+        _webhook_secrets.pop(target, None)
+    if target not in _webhook_secrets:
+        conn = get_db_connection()
+        cur = conn.cursor()
+        cur.execute("SELECT secret FROM asana_webhooks WHERE target = %s AND secret IS NOT NULL", (target,))
+        row = cur.fetchone()
+        cur.close()
+        conn.close()
+        if not row:
+            return None
+        _webhook_secrets[target] = row[0]
+    return _webhook_secrets[target]
+
+def asana_webhooks_active():
+    """True once at least one webhook has completed its handshake."""
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor()
+        cur.execute("SELECT EXISTS (SELECT 1 FROM asana_webhooks WHERE secret IS NOT NULL)")
+        active = cur.fetchone()[0]
+        cur.close()
+        conn.close()
+        return active
+    except Exception as e:
+        print(f"[DEBUG] Couldn't check Asana webhooks: {e}")
+        return False
+
+def sign_asana_payload(secret, body):
+    return hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+def queue_asana_task_changes(project_gid, changes):
+    """
+    Add (task_gid, action) pairs reported by `project_gid`'s webhook to the pending
+    set and (re)arm the debounce timer.
+    A burst of events for the same tasks collapses into one flush; the flush is
+    never postponed more than ASANA_WEBHOOK_MAX_DELAY_SECONDS past the first event.
+    """
+    global _webhook_timer, _webhook_first_at
+    with _webhook_lock:
+        for gid, action in changes:
+            _webhook_pending[gid] = (project_gid, action)
+        now = time.monotonic()
+        if _webhook_first_at is None:
+            _webhook_first_at = now
+        delay = min(ASANA_WEBHOOK_DEBOUNCE_SECONDS,
+                    max(0.0, _webhook_first_at + ASANA_WEBHOOK_MAX_DELAY_SECONDS - now))
+        if _webhook_timer:
+            _webhook_timer.cancel()
+        _webhook_timer = threading.Timer(delay, flush_asana_task_changes)
+        _webhook_timer.daemon = True
+        _webhook_timer.start()
+
+def flush_asana_task_changes():
+    global _webhook_timer, _webhook_first_at
+    with _webhook_lock:
+        pending = dict(_webhook_pending)
+        _webhook_pending.clear()
+        _webhook_timer = None
+        _webhook_first_at = None
+    if not pending:
+        return
+    by_project = {}
+    for gid, (project_gid, action) in pending.items():
+        by_project.setdefault(project_gid, {})[gid] = action
+    with _webhook_flush_lock:
+        for project_gid, changes in by_project.items():
+            try:
+                sync_asana_task_gids(project_gid, changes)
+            except Exception as e:
+                print("Error syncing Asana webhook changes:", e)
+                # Retry with the next flush; changes queued since then are newer and win.
+                with _webhook_lock:
+                    retry = [(gid, action) for gid, action in changes.items() if gid not in _webhook_pending]
+                if retry:
+                    queue_asana_task_changes(project_gid, retry)
+
+def sync_asana_task_gids(project_gid, changes):
+    """
+    Apply a {task_gid: action} map from `project_gid`'s webhook: delete deleted tasks,
+    re-fetch and upsert the rest. A task removed from the project is kept if another
+    configured project still holds it. Deletes only touch rows tagged with `project_gid`.
+    """
+    projects = load_asana_projects()
+    if project_gid not in projects:
+        print(f"[DEBUG] Ignoring webhook changes for unconfigured project {project_gid}")
+        return
+    removed = [gid for gid, action in changes.items() if action == "deleted"]
+    to_fetch = [gid for gid, action in changes.items() if action != "deleted"]
+    tasks, missing = run_asana(fetch_asana_tasks_by_gid(to_fetch)) if to_fetch else ([], [])
+    owners = {}
+    for task in tasks:
+        owners[task.get("gid")] = asana_task_owner(task, projects) if "projects" in task else project_gid
+    # A task moved out of every configured project still fetches fine; it just isn't ours any more.
+    missing += [gid for gid, owner in owners.items() if owner is None]
+    tasks = [task for task in tasks if owners.get(task.get("gid"))]
+    print(f"[DEBUG] Webhook sync: fetched {len(tasks)} of {len(to_fetch)} changed tasks")
+
+    deleted_count = 0
+    for gid in removed + missing:
+        deleted_count += delete_event(gid, source_project=project_gid)
+
+    current_year = datetime.now().year
+    events = []
+    undated = {task["gid"] for task in tasks if task.get("gid") and not task.get("due_on")}
+    for task in tasks:
+        if not task.get("gid"):
+            continue
+        new_event = asana_task_to_event(task, projects[owners[task["gid"]]])
+        try:
+            if datetime.strptime(new_event["start_date"], "%Y-%m-%d").year != current_year:
+                continue
+        except ValueError:
+            pass
+        events.append(new_event)
+    keep_first_seen_dates(events, undated)
+    new, changed, unchanged = diff_events(events)
+    for event in new + changed:
+        if needs_image_download(event):
+            event["image_data"], event["image_format"] = download_asana_image(event["image"])
+    updated = 0
+    if new:
+        add_events(new)
+    if changed:
+        updated = update_events(changed)
+    print(f"[DEBUG] Webhook sync complete. Added: {len(new)}, Updated: {updated}, "
+          f"Unchanged: {unchanged}, Deleted: {deleted_count}")
+
+@app.route("/webhooks/asana", methods=["POST"])
+def asana_webhook():
+    # Each registered webhook points at /webhooks/asana?project=<gid>, which keys its secret.
+    target = request.args.get("project", "")
+    if target not in load_asana_projects():
+        return jsonify({"error": "Unknown webhook"}), 404
+
+    hook_secret = request.headers.get("X-Hook-Secret")
+    if hook_secret:
+        # Handshake: only accepted while our own registration request is in flight,
+        # so it can't be planted ahead of time or replayed to swap keys.
+        if not save_asana_webhook_secret(target, hook_secret):
+            return jsonify({"error": "No webhook registration in progress"}), 409
+        if _scheduler:
+            _scheduler.reschedule_job("asana_sync", trigger="interval", seconds=ASANA_RECONCILE_SECONDS)
+        print(f"[DEBUG] Asana webhook handshake completed for '{target}'")
+        response = Response(status=200)
+        response.headers["X-Hook-Secret"] = hook_secret
+        return response
+
+    secret = get_asana_webhook_secret(target)
+    if not secret:
+        return jsonify({"error": "Unknown webhook"}), 404
+    signature = request.headers.get("X-Hook-Signature", "")
+    if not hmac.compare_digest(sign_asana_payload(secret, request.get_data()), signature):
+        # The cached secret may predate a re-registration handled by another worker
+        secret = get_asana_webhook_secret(target, refresh=True)
+        if not secret or not hmac.compare_digest(sign_asana_payload(secret, request.get_data()), signature):
+            return jsonify({"error": "Invalid signature"}), 401
+
+    payload = request.get_json(silent=True) or {}
+    changes = []
+    for ev in payload.get("events", []):
+        resource = ev.get("resource") or {}
+        if resource.get("resource_type") != "task" or not resource.get("gid"):
+            continue
+        action = ev.get("action", "changed")
+        parent = ev.get("parent") or {}
+        # "removed" from a section just moves the task; only removal from the project drops it.
+        if action == "removed" and parent.get("resource_type") != "project":
+            action = "changed"
+        changes.append((resource["gid"], action))
+    if changes:
+        queue_asana_task_changes(target, changes)
+    return jsonify({"queued": len(changes)})
+
+@app.cli.command("asana-webhook-register")
+@click.argument("base_url")
+@click.option("--project", "project_gids", multiple=True, help="Project gid (repeatable); default: all configured.")
+def asana_webhook_register(base_url, project_gids):
+    """Register an Asana webhook per configured project pointing at BASE_URL."""
+    headers = {"authorization": f"Bearer {os.getenv('ASANA_TOKEN')}"}
+    configured = load_asana_projects()
+    for project_gid in project_gids or configured:
+        if project_gid not in configured:
+            print(f"{project_gid}: not in ASANA_PROJECTS, skipped")
+            continue
+        # Asana performs the handshake before answering this request
+        expect_asana_webhook_handshake(project_gid)
+        try:
+            response = requests.post(f"{ASANA_API_BASE}/webhooks", headers=headers, timeout=30, json={"data": {
+                "resource": project_gid,
+                "target": f"{base_url.rstrip('/')}/webhooks/asana?project={project_gid}",
+                "filters": [{"resource_type": "task"}]
+            }})
+        finally:
+            end_asana_webhook_registration(project_gid)
+        print(project_gid, response.status_code, response.text)
+
+@app.cli.command("asana-webhook-standin")
+@click.option("--base-url", default="http://127.0.0.1:5000", show_default=True)
+@click.option("--project", "project_gid", help="Configured project gid; default: the first one.")
+@click.option("--task", "task_gids", multiple=True, required=True, help="Task gid to report (repeatable).")
+@click.option("--action", default="changed", show_default=True)
+@click.option("--repeat", default=1, show_default=True, help="Number of payloads to post.")
+def asana_webhook_standin(base_url, project_gid, task_gids, action, repeat):
+    """Act like Asana locally: register and handshake a project's webhook, then post signed task events."""
+    project_gid = project_gid or next(iter(load_asana_projects()), None)
+    if not project_gid:
+        print("No Asana projects configured (ASANA_PROJECTS or ASANA_DEMO_PROJECT_ID).")
+        return
+    url = f"{base_url.rstrip('/')}/webhooks/asana?project={project_gid}"
+    secret = secrets.token_hex(32)
+    expect_asana_webhook_handshake(project_gid)
+    try:
+        response = requests.post(url, headers={"X-Hook-Secret": secret}, timeout=10)
+    finally:
+        end_asana_webhook_registration(project_gid)
+    if response.headers.get("X-Hook-Secret") != secret:
+        print(f"Handshake not echoed ({response.status_code}); is the target already registered?")
+        return
+    for _ in range(repeat):
+        body = json.dumps({"events": [{
+            "action": action,
+            "resource": {"gid": gid, "resource_type": "task"},
+            "parent": None,
+            "created_at": datetime.utcnow().isoformat() + "Z"
+        } for gid in task_gids]}).encode("utf-8")
+        response = requests.post(url, data=body, timeout=10, headers={
+            "Content-Type": "application/json",
+            "X-Hook-Signature": sign_asana_payload(secret, body)
+        })
+        print(response.status_code, response.text.strip())
+
+@app.cli.command("asana-api-standin")
+@click.option("--port", default=5050, show_default=True)
+@click.option("--tasks", "task_count", default=250, show_default=True, help="Number of tasks in each fake project.")
+@click.option("--throttle-rate", default=0.2, show_default=True, help="Share of requests answered with 429.")
+@click.option("--error-rate", default=0.05, show_default=True, help="Share of requests answered with 503.")
+@click.option("--retry-after", default=2, show_default=True, help="Seconds sent in Retry-After.")
+@click.option("--quota", default=150, show_default=True, help="Requests per minute before every request gets a 429.")
+@click.option("--latency", default=0.0, show_default=True, help="Seconds added to every response.")
+def asana_api_standin(port, task_count, throttle_rate, error_rate, retry_after, quota, latency):
+    """
+    Serve a fake Asana API that injects 429s and 503s; point ASANA_API_BASE at it.
+    Any project gid can be listed; each gets its own TASKS tasks on first request.
+    """
+    from werkzeug.serving import run_simple
+
+    standin = Flask("asana_standin")
+    today = date.today()
+    tasks = {}
+    project_gids = {}
+
+    def project_task_gids(project_gid):
+        if project_gid not in project_gids:
+            gids = []
+            for i in range(task_count):
+                gid = f"{project_gid}{1000 + i}"
+                tasks[gid] = {
+                    "gid": gid,
+                    "name": f"Stand-in event {i} ({project_gid})",
+                    "due_on": (today + timedelta(days=i % 60)).isoformat(),
+                    "custom_fields": [
+                        {"name": "Event Status", "display_value": "Approved"},
+                        {"name": "Locations", "display_value": "17 - Smith Street"},
+                    ],
+                    "projects": [{"gid": project_gid}],
+                }
+                gids.append(gid)
+            project_gids[project_gid] = gids
+        return project_gids[project_gid]
+
+    recent = deque()
+    lock = threading.Lock()
+
+    @standin.before_request
+    def inject_failures():
+        now = time.monotonic()
+        with lock:
+            while recent and recent[0] < now - 60:
+                recent.popleft()
+            recent.append(now)
+            g.used = len(recent)
+        time.sleep(latency)
+        roll = random.random()
+        if g.used > quota or roll < throttle_rate:
+            response = jsonify({"errors": [{"message": "You have made too many requests recently."}]})
+            response.status_code = 429
+            response.headers["Retry-After"] = str(retry_after)
+            return response
+        if roll < throttle_rate + error_rate:
+            return jsonify({"errors": [{"message": "Server Error"}]}), 503
+
+    @standin.after_request
+    def rate_limit_headers(response):
+        response.headers["X-RateLimit-Limit"] = str(quota)
+        response.headers["X-RateLimit-Remaining"] = str(max(0, quota - g.used))
+        print(f"[DEBUG] {request.method} {request.path} -> {response.status_code}")
+        return response
+
+    @standin.route("/projects/<project_gid>/tasks")
+    def project_tasks(project_gid):
+        limit = request.args.get("limit", 100, type=int)
+        offset = request.args.get("offset", 0, type=int)
+        with lock:
+            gids = project_task_gids(project_gid)
+        page = [tasks[gid] for gid in gids[offset:offset + limit]]
+        next_page = None
+        if offset + limit < len(gids):
+            next_page = {"offset": str(offset + limit)}
+        return jsonify({"data": page, "next_page": next_page})
+
+    @standin.route("/tasks/<gid>")
+    def task(gid):
+        if gid not in tasks:
+            return jsonify({"errors": [{"message": "task: Unknown object"}]}), 404
+        return jsonify({"data": tasks[gid]})
+
+    @standin.route("/batch", methods=["POST"])
+    def batch():
+        results = []
+        for action in (request.json or {}).get("data", {}).get("actions", []):
+            gid = action.get("relative_path", "").rsplit("/", 1)[-1]
+            if gid in tasks:
+                results.append({"status_code": 200, "body": {"data": tasks[gid]}})
+            else:
+                results.append({"status_code": 404, "body": {"errors": [{"message": "Unknown object"}]}})
+        return jsonify({"data": results})
+
+    run_simple("127.0.0.1", port, standin, threaded=True)
+
+# --------------------------
+# Image Uploads
+# --------------------------
+# Multipart file parts are written straight from the request body to spool files
+# on disk (never buffered in memory), then validated, compressed and stored on the
+# upload pool after the response has gone out.
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR") or tempfile.gettempdir()
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "2"))
+_upload_pool = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="upload")
+
+class SpoolingRequest(Request):
+    """Request whose file uploads go to named spool files; those not claimed are deleted on close."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        spool = tempfile.NamedTemporaryFile(dir=UPLOAD_SPOOL_DIR, prefix="upload-", delete=False)
+        self.__dict__.setdefault("spooled_paths", set()).add(spool.name)
+        return spool
+
+    def claim_spooled(self, upload):
+        """Take ownership of an upload's spool file and return its path."""
+        upload.stream.flush()
+        self.__dict__.get("spooled_paths", set()).discard(upload.stream.name)
+        return upload.stream.name
+
+    def close(self):
+        super().close()
+        for path in self.__dict__.pop("spooled_paths", ()):
+            with contextlib.suppress(OSError):
+                os.remove(path)
+
+app.request_class = SpoolingRequest
+
+def attach_uploaded_image(asana_task_gid, path):
+    """Validate and compress a spooled upload, then store it on the event. Runs on the upload pool."""
     try:
-        tasks = asyncio.run(fetch_tasks_from_asana())
-        print(f"[DEBUG] Fetched {len(tasks)} tasks from Asana")
-        
-        # Get the current year
-        current_year = datetime.now().year
-        print(f"[DEBUG] Filtering for events in {current_year}")
-        
-        def get_cf(task, field_name):
-            for cf in task.get("custom_fields", []):
-                if cf.get("name") == field_name:
-                    return cf.get("display_value", "")
-            return ""
-        
-        added_count = 0
-        skipped_count = 0
-        for task in tasks:
-            asana_task_gid = task.get("gid")
-            if not asana_task_gid:
+        with open(path, "rb") as f:
+            content = f.read()
+        image_format = inspect_image(content)
+        compressed = compress_image(content)
+        if compressed:
+            content, image_format = compressed, "JPEG"
+        conn = get_db_connection()
+        cur = conn.cursor()
+        cur.execute("UPDATE events SET image_data = %s, image_format = %s WHERE asana_task_gid = %s",
+                    (psycopg2.Binary(content), image_format, asana_task_gid))
+        conn.commit()
+        cur.close()
+        conn.close()
+        print(f"[DEBUG] Attached uploaded image to {asana_task_gid}: {len(content)} bytes {image_format}")
+    except ImageRejected as e:
+        print(f"[DEBUG] Rejected uploaded image for {asana_task_gid}: {e}")
+    except Exception as e:
+        print(f"Error attaching uploaded image for {asana_task_gid}: {e}")
+    finally:
+        os.remove(path)
+
+# --------------------------
+# Bulk Event API
+# --------------------------
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "20000"))
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+BULK_EVENT_FIELDS = (
+    "event_status", "ministry", "organizer", "website_trigger", "registration", "title",
+    "start_date", "start_time", "end_date", "end_time", "location", "description", "image", "image_url"
+)
+BULK_VALUES_TEMPLATE = ("(%s, %s, %s, %s, %s, %s, %s, %s::date, %s::time, %s::date, %s::time, "
+                        "%s, %s, %s, %s, %s)")
+
+def validate_bulk_event(item):
+    """Turn one submitted item into an event dictionary. Returns (event, error)."""
+    if not isinstance(item, dict):
+        return None, "Item must be an object"
+    unknown = sorted(set(item) - set(BULK_EVENT_FIELDS) - {"asana_task_gid", "external_id"})
+    if unknown:
+        return None, f"Unknown field(s): {', '.join(unknown)}"
+    for field in BULK_EVENT_FIELDS:
+        if item.get(field) is not None and not isinstance(item[field], str):
+            return None, f"Field '{field}' must be a string"
+    for field in ("asana_task_gid", "external_id"):
+        value = item.get(field)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (str, int))):
+            return None, f"Field '{field}' must be a string or integer"
+    if item.get("asana_task_gid"):
+        key = str(item["asana_task_gid"])
+    elif item.get("external_id"):
+        # Namespaced so pushed ids can't collide with Asana or ICS UIDs
+        key = f"ext:{item['external_id']}"
+    else:
+        return None, "Missing field 'asana_task_gid' or 'external_id'"
+    for field in ("title", "start_date", "start_time"):
+        if not item.get(field):
+            return None, f"Missing field '{field}'"
+    try:
+        for field in ("start_date", "end_date"):
+            if item.get(field):
+                datetime.strptime(item[field], "%Y-%m-%d")
+        for field in ("start_time", "end_time"):
+            if item.get(field):
+                datetime.strptime(item[field], "%H:%M")
+    except (TypeError, ValueError):
+        return None, f"Invalid {field}; use YYYY-MM-DD dates and HH:MM times"
+    event = {field: item.get(field) for field in BULK_EVENT_FIELDS}
+    event["asana_task_gid"] = key
+    event["end_date"] = event["end_date"] or None
+    event["end_time"] = event["end_time"] or None
+    event["image"] = event["image"] or ""
+    event["image_url"] = event["image_url"] or event["image"]
+    event["description"] = event["description"] or ""
+    event["location"] = event["location"] or ""
+    return event, None
+
+def bulk_event_row(event):
+    return (event["asana_task_gid"],) + tuple(event.get(field) for field in BULK_EVENT_FIELDS) + \
+        (event_content_hash(event),)
+
+@partitioned_write
+def upsert_event_chunk(events):
+    """
+    Write one chunk in a single transaction: one multi-row UPDATE for the keys that
+    exist, one multi-row INSERT for the rest. Returns the set of keys updated.
+    The image bytes are kept unless the image URL changed.
+    """
+    columns = ", ".join(BULK_EVENT_FIELDS)
+    rows = [bulk_event_row(event) for event in events]
+    conn = get_db_connection()
+    cur = conn.cursor()
+    # Take the writer lock before the UPDATE's snapshot: waiting for it inside the trigger
+    # would leave the snapshot from before a concurrent push inserted the same keys.
+    cur.execute("SELECT pg_advisory_xact_lock(%s)", (EVENTS_WRITE_LOCK,))
+    updated = psycopg2.extras.execute_values(cur, f"""
+        UPDATE events SET
+            {", ".join(f"{field} = v.{field}" for field in BULK_EVENT_FIELDS)},
+            content_hash = v.content_hash,
+            image_data = CASE WHEN events.image_url IS DISTINCT FROM v.image_url THEN NULL ELSE events.image_data END,
+            image_format = CASE WHEN events.image_url IS DISTINCT FROM v.image_url THEN NULL ELSE events.image_format END
+        FROM (VALUES %s) AS v (asana_task_gid, {columns}, content_hash)
+        WHERE events.asana_task_gid = v.asana_task_gid
+        RETURNING events.asana_task_gid
+    """, rows, template=BULK_VALUES_TEMPLATE, page_size=len(rows), fetch=True)
+    updated = {row[0] for row in updated}
+    missing = [row for row in rows if row[0] not in updated]
+    if missing:
+        execute_unarchive(cur, [row[0] for row in missing])
+        psycopg2.extras.execute_values(cur, f"""
+            INSERT INTO events (asana_task_gid, {columns}, content_hash) VALUES %s
+        """, missing, template=BULK_VALUES_TEMPLATE, page_size=len(missing))
+    conn.commit()
+    cur.close()
+    conn.close()
+    return updated
+
+def read_bulk_items():
+    """Items from a JSON array body or an NDJSON stream (one object per line). Raises ValueError."""
+    if request.mimetype in ("application/x-ndjson", "application/jsonl"):
+        items = []
+        for number, line in enumerate(request.stream, 1):
+            if not line.strip():
                 continue
-            
-            title = task.get("name", "Unnamed Task")
-            due_on = task.get("due_on")
-            start_date = due_on if due_on else datetime.now().strftime("%Y-%m-%d")
-            
-            # Skip events not in the current year
             try:
-                event_year = datetime.strptime(start_date, "%Y-%m-%d").year
-                if event_year != current_year:
-                    print(f"[DEBUG] Skipping event {title} from year {event_year}")
-                    skipped_count += 1
-                    continue
+                items.append(json.loads(line))
             except ValueError:
-                print(f"[DEBUG] Couldn't parse date for event {title}, using default")
-                
-            # Check if the event already exists before proceeding
-            if event_exists(asana_task_gid):
-                print(f"[DEBUG] Event {title} already exists, skipping")
-                skipped_count += 1
-                continue
-                
-            start_time = "09:00"
-            end_time = "10:00"
-            
-            event_status    = get_cf(task, "Event Status") or "Approved"
-            ministry        = get_cf(task, "Ministry") or ""
-            organizer       = ministry or "Asana Import"
-            website_trigger = get_cf(task, "Website Trigger") or "Publish"
-            registration    = get_cf(task, "Registration") or ""
-            description     = get_cf(task, "Content") or title
-            
-            # Apply HTML sanitization AFTER description is defined
-            description = sanitize_html(description)
-            
-            image           = get_cf(task, "Graphics") or ""
-            location        = get_cf(task, "Locations") or ""
-            
-            if "dropbox.com" in image and "dl=0" in image:
-                image = image.replace("dl=0", "raw=1")
-            
-            location = location.strip()
-            if location.startswith("17 -"):
-                location = "17 Smith Street"
-            elif location.startswith("163"):
-                location = "163 Livingston Street"
-            elif location.startswith("392"):
-                location = "392 Fulton Street"
-            elif location.startswith("190"):
-                location = "190 Livingston Street"
-            
-            # Download image if URL exists
-            image_data = None
-            image_url = image
-            if image:
-                try:
-                    print(f"[DEBUG] Downloading image from {image}")
-                    # Add a user-agent header to mimic a browser
-                    headers = {
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                    }
-                    response = requests.get(image, timeout=15, headers=headers)
-                    response.raise_for_status()
-                    image_data = response.content
-                    print(f"[DEBUG] Downloaded image: {len(image_data)} bytes")
-                    
-                    # Verify that we actually got an image
-                    if len(image_data) < 100:
-                        print(f"[WARNING] Downloaded file seems too small to be an image ({len(image_data)} bytes)")
-                        image_data = get_placeholder_image()
-                except requests.exceptions.HTTPError as e:
-                    if e.response.status_code == 403:
-                        print(f"[DEBUG] Access forbidden to image: {image}. Using placeholder.")
-                        image_data = get_placeholder_image()
-                    else:
-                        print(f"[DEBUG] HTTP error downloading image: {e}")
-                        image_data = get_placeholder_image()
-                except Exception as e:
-                    print(f"[DEBUG] Error downloading image: {e}")
-                    image_data = get_placeholder_image()
-            
-            new_event = {
-                "asana_task_gid": asana_task_gid,
-                "event_status": event_status,
-                "ministry": ministry,
-                "organizer": organizer,
-                "website_trigger": website_trigger,
-                "registration": registration,
-                "title": title,
-                "start_date": start_date,
-                "start_time": start_time,
-                "end_date": start_date,
-                "end_time": end_time,
-                "location": location,
-                "description": description,
-                "image": image,
-                "image_url": image_url,
-                "image_data": image_data
-            }
-            
-            new_event = adjust_for_cancellation(new_event)
-            
-            # Only add the event if it doesn't exist
-            add_event(new_event)
-            added_count += 1
-            print(f"[DEBUG] Inserted event for task: {new_event['title']}")
-                
-        print(f"[DEBUG] Asana sync complete. Added: {added_count}, Skipped: {skipped_count}")
-    except Exception as e:
-        print("Error processing Asana tasks:", e)
+                raise ValueError(f"Invalid JSON on line {number}")
+            if len(items) > BULK_MAX_ITEMS:
+                break
+        return items
+    items = request.get_json(silent=True)
+    if not isinstance(items, list):
+        raise ValueError("Body must be a JSON array of events or NDJSON")
+    return items
+
+@app.route("/api/events/bulk", methods=["POST"])
+def bulk_events_api():
+    """
+    Create or update many events at once, keyed by asana_task_gid or external_id.
+    Every item is validated before anything is written; valid items are then
+    upserted in BULK_CHUNK_SIZE transactions. Returns one result per item.
+    """
+    try:
+        items = read_bulk_items()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if len(items) > BULK_MAX_ITEMS:
+        return jsonify({"error": f"At most {BULK_MAX_ITEMS} events per request"}), 413
 
+    results = []
+    valid = {}
+    for index, item in enumerate(items):
+        event, error = validate_bulk_event(item)
+        if event and event["asana_task_gid"] in valid:
+            event, error = None, f"Duplicate key '{event['asana_task_gid']}' (first at item {valid[event['asana_task_gid']][0]})"
+        if error:
+            results.append({"index": index, "status": "invalid", "error": error})
+            continue
+        valid[event["asana_task_gid"]] = (index, event)
+        results.append({"index": index, "key": event["asana_task_gid"]})
 
-def start_asana_scheduler():
-    scheduler = BackgroundScheduler()
-    scheduler.add_job(process_asana_tasks, 'interval', seconds=60, max_instances=1)
-    scheduler.start()
+    existing = existing_event_hashes(list(valid))
+    archived = archived_event_gids(list(existing))
+    to_write = []
+    for index, event in valid.values():
+        stored = existing.get(event["asana_task_gid"])
+        if stored and stored[0] == event_content_hash(event):
+            results[index]["status"] = "unchanged"
+        elif event["asana_task_gid"] in archived and not leaves_archive(event, archived[event["asana_task_gid"]]):
+            # Edits within an archived year are refused; moving the event out of it reinserts it
+            results[index].update(status="invalid", error="Event is in an archived year")
+        else:
+            to_write.append((index, event))
+
+    for i in range(0, len(to_write), BULK_CHUNK_SIZE):
+        chunk = to_write[i:i + BULK_CHUNK_SIZE]
+        try:
+            updated = upsert_event_chunk([event for _, event in chunk])
+        except psycopg2.Error as e:
+            print(f"[DEBUG] Bulk chunk of {len(chunk)} events failed: {e}")
+            for index, _ in chunk:
+                results[index].update(status="error", error="Database error; chunk rolled back")
+            continue
+        for index, event in chunk:
+            results[index]["status"] = "updated" if event["asana_task_gid"] in updated else "created"
+
+    counts = Counter(result["status"] for result in results)
+    print(f"[DEBUG] Bulk events: {dict(counts)}")
+    return jsonify({"counts": counts, "results": results})
 
 # --------------------------
 # Flask Routes
 # --------------------------
 @app.route("/api/events", methods=["GET", "POST"])
+@conditional_get
 def events_api():
     if request.method == "GET":
-        events = load_events()
+        try:
+            start_date = request.args.get("start")
+            end_date = request.args.get("end")
+            if start_date:
+                start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+            if end_date:
+                end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+        except ValueError:
+            return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+        events = load_events(start_date, end_date, event_filters_from_request(), include_archive=True)
         return jsonify(events)
     elif request.method == "POST":
-        data = request.json or {}
+        upload = None
+        if request.mimetype == "multipart/form-data":
+            # Form fields plus an optional "image" file part
+            if request.content_length is None:
+                return jsonify({"error": "Content-Length required"}), 411
+            # The image can't be larger than the request carrying it
+            if request.content_length > IMAGE_MAX_BYTES + 1024 * 1024:
+                return jsonify({"error": "Upload too large"}), 413
+            # A blank form field means "not given", not an empty date or time
+            data = {key: value or None for key, value in request.form.items()}
+            upload = request.files.get("image")
+        else:
+            data = request.json or {}
         required_fields = ["title", "start_date", "start_time"]
         for field in required_fields:
-            if field not in data:
+            if data.get(field) is None:
                 return jsonify({"error": f"Missing field '{field}'"}), 400
+        spooled = request.claim_spooled(upload) if upload and upload.filename else None
         new_event = {
-            "asana_task_gid": data.get("asana_task_gid"),
+            # Every row needs a key: the month payload, detail API and image attach all address events by it
+            "asana_task_gid": data.get("asana_task_gid") or f"manual-{uuid.uuid4().hex}",
             "event_status": data.get("event_status"),
             "ministry": data.get("ministry"),
+            "organizer": data.get("organizer"),
             "website_trigger": data.get("website_trigger"),
             "registration": data.get("registration"),
             "title": data["title"],
@@ -723,105 +3287,150 @@ def events_api():
             "start_time": data["start_time"],
             "end_date": data.get("end_date", None),
             "end_time": data.get("end_time", None),
-            "description": data.get("description", ""),
-            "image": data.get("image", ""),
-            "location": data.get("location", "")
+            "description": data.get("description") or "",
+            "image": data.get("image") or "",
+            "image_url": data.get("image_url") or data.get("image") or "",
+            "location": data.get("location") or ""
         }
-        added_event = add_event(new_event)
-        return jsonify({"status": "success", "event": added_event}), 201
+        try:
+            added_event = add_event(new_event)
+        except Exception:
+            if spooled:
+                os.remove(spooled)
+            raise
+        if spooled:
+            _upload_pool.submit(attach_uploaded_image, added_event["asana_task_gid"], spooled)
+        return jsonify({"status": "success", "event": added_event, "image_pending": bool(spooled)}), 201
 
 
 @app.route("/api/events/date/<date_str>")
+@conditional_get
 def events_by_date(date_str):
     try:
         target_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-        all_events = load_events()
-        filtered_events = []
-        for event in all_events:
-            try:
-                event_date = datetime.strptime(event["start_date"], "%Y-%m-%d").date()
-                if event_date == target_date:
-                    filtered_events.append(event)
-            except (ValueError, KeyError):
-                continue
+        filtered_events = load_events(target_date, target_date, event_filters_from_request())
         return jsonify(filtered_events)
     except ValueError:
         return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
 
 
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+
+def search_events(query, start_date=None, end_date=None, cursor=None, limit=SEARCH_PAGE_SIZE):
+    """
+    Ranked full-text search over title, ministry, location and plain-text description.
+    Results are ordered by (rank, id) descending; `cursor` is the (rank, id) of the
+    last row of the previous page. Snippets are only built for the returned page.
+    Returns (results, next_cursor).
+    """
+    conditions = ["search_vector @@ q.query"]
+    params = [query]
+    if start_date:
+        conditions.append("start_date >= %s")
+        params.append(start_date)
+    if end_date:
+        conditions.append("start_date <= %s")
+        params.append(end_date)
+    if cursor:
+        conditions.append("(ts_rank(search_vector, q.query), id) < (%s::real, %s)")
+        params.extend(cursor)
+    params.append(limit + 1)
+    conn = get_read_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        WITH q AS (SELECT websearch_to_tsquery('english', %s) AS query)
+        SELECT hits.id, hits.asana_task_gid, hits.title, to_char(hits.start_date, 'YYYY-MM-DD'),
+               to_char(hits.start_time, 'HH24:MI'), hits.location, hits.ministry, hits.rank,
+               ts_headline('english', regexp_replace(coalesce(hits.description, ''), '<[^>]*>', ' ', 'g'),
+                           q.query, 'StartSel=<mark>, StopSel=</mark>, MaxWords=30, MinWords=10')
+        FROM (
+            SELECT id, asana_task_gid, title, start_date, start_time, location, ministry, description,
+                   ts_rank(search_vector, q.query) AS rank
+            FROM events_all, q
+            WHERE """ + " AND ".join(conditions) + """
+            ORDER BY rank DESC, id DESC
+            LIMIT %s
+        ) hits, q
+        ORDER BY hits.rank DESC, hits.id DESC
+    """, params)
+    rows = cur.fetchall()
+    cur.close()
+    conn.close()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = f"{rows[-1][7]}:{rows[-1][0]}"
+    results = [{
+        "asana_task_gid": row[1],
+        "title": row[2],
+        "start_date": row[3],
+        "start_time": row[4],
+        "location": row[5],
+        "ministry": row[6],
+        "rank": row[7],
+        "snippet": row[8]
+    } for row in rows]
+    return results, next_cursor
+
+@app.route("/api/search")
+def search_api():
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "Missing search query 'q'"}), 400
+    try:
+        start_date = request.args.get("start")
+        end_date = request.args.get("end")
+        if start_date:
+            start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+        if end_date:
+            end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+    try:
+        limit = min(max(int(request.args.get("limit", SEARCH_PAGE_SIZE)), 1), SEARCH_MAX_PAGE_SIZE)
+        cursor = None
+        if request.args.get("cursor"):
+            rank, row_id = request.args["cursor"].split(":")
+            cursor = (float(rank), int(row_id))
+    except ValueError:
+        return jsonify({"error": "Invalid 'limit' or 'cursor'"}), 400
+    results, next_cursor = search_events(query, start_date, end_date, cursor, limit)
+    return jsonify({"results": results, "next_cursor": next_cursor})
+
+
 @app.route("/api/list_events/<date_str>")
+@conditional_get
 def list_events(date_str):
     try:
         target_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-        all_events = load_events()
-        filtered_events = []
-        for event in all_events:
-            try:
-                event_date = datetime.strptime(event["start_date"], "%Y-%m-%d").date()
-                if event_date == target_date:
-                    filtered_events.append(event)
-            except (ValueError, KeyError):
-                continue
+        filters = event_filters_from_request()
+        filtered_events = load_events(target_date, target_date, filters)
 
         if not filtered_events:
-            upcoming_events = []
-            for event in all_events:
-                try:
-                    event_date = datetime.strptime(event["start_date"], "%Y-%m-%d").date()
-                    if event_date >= date.today():
-                        upcoming_events.append(event)
-                except (ValueError, KeyError):
-                    continue
-
-            def event_sort_key(ev):
-                try:
-                    return datetime.strptime(ev["start_date"] + " " + ev["start_time"], "%Y-%m-%d %H:%M")
-                except Exception:
-                    return datetime.max
-            upcoming_events.sort(key=event_sort_key)
-            filtered_events = upcoming_events
+            filtered_events = load_upcoming_events(date.today(), filters)
 
         return render_template("list_events_fragment.html", events=filtered_events)
     except ValueError:
         return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
 
 @app.route("/api/row_events/<date_str>")
+@conditional_get
 def row_events(date_str):
     try:
         target_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-        all_events = load_events()
-        filtered_events_row = []
-        for event in all_events:
-            try:
-                event_date = datetime.strptime(event["start_date"], "%Y-%m-%d").date()
-                if event_date == target_date:
-                    filtered_events_row.append(event)
-            except (ValueError, KeyError):
-                continue
+        filters = event_filters_from_request()
+        filtered_events_row = load_events(target_date, target_date, filters)
 
         if not filtered_events_row:
-            upcoming_events = []
-            for event in all_events:
-                try:
-                    event_date = datetime.strptime(event["start_date"], "%Y-%m-%d").date()
-                    if event_date >= date.today():
-                        upcoming_events.append(event)
-                except (ValueError, KeyError):
-                    continue
-
-            def event_sort_key(ev):
-                try:
-                    return datetime.strptime(ev["start_date"] + " " + ev["start_time"], "%Y-%m-%d %H:%M")
-                except Exception:
-                    return datetime.max
-            upcoming_events.sort(key=event_sort_key)
-            filtered_events_row = upcoming_events
+            filtered_events_row = load_upcoming_events(date.today(), filters)
 
         return render_template("row_events_fragment.html", events=filtered_events_row)
     except ValueError:
         return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
 
 @app.route("/api/calendar")
+@conditional_get
 def api_calendar():
     try:
         year = int(request.args.get('year', date.today().year))
@@ -832,15 +3441,14 @@ def api_calendar():
 
     cal = calendar.Calendar(firstweekday=6)
     month_days = cal.monthdatescalendar(year, month)
-    events = load_events()
+    events = load_events(*month_range(year, month), event_filters_from_request())
     events_by_day = {}
     for ev in events:
         try:
             ev_date = datetime.strptime(ev["start_date"], "%Y-%m-%d").date()
         except ValueError:
             continue
-        if ev_date.year == year and ev_date.month == month:
-            events_by_day.setdefault(ev_date.day, []).append(ev)
+        events_by_day.setdefault(ev_date.day, []).append(ev)
     return render_template("calendar_fragment.html",
                            year=year,
                            month=month,
@@ -849,22 +3457,82 @@ def api_calendar():
                            events_monthly=events_by_day,
                            today=date.today())
 
+@app.route("/api/month")
+@read_snapshot()
+@conditional_get
+def month_api():
+    """
+    Compact JSON month: `days` maps day of month to event gids in start order and
+    `events` holds each event once, as parallel lists keyed by field. With
+    ?since=<version> only events changed after that version are returned, and
+    `removed` lists gids to drop; a client applies it by first removing every
+    changed or removed gid from its days, then merging in the new `days`. When
+    `since` is too old to answer incrementally a full month comes back instead.
+    """
+    try:
+        year = int(request.args.get("year", date.today().year))
+        month = int(request.args.get("month", date.today().month))
+        since = request.args.get("since")
+        since = int(since) if since else None
+        start_date, end_date = month_range(year, month)
+    except ValueError:
+        return jsonify({"error": "Invalid year, month or since parameter."}), 400
+    filters = event_filters_from_request()
+    # Read the version first: writers are serialized (events_lock_writers), so every row at
+    # or below it is committed, and read_snapshot keeps the row reads on the same snapshot.
+    version, _ = get_data_version()
+    changed = changed_event_gids(since) if since is not None else None
+    if changed is None:
+        days, columns = month_payload(load_events(start_date, end_date, filters))
+        return jsonify({"year": year, "month": month, "version": version, "full": True,
+                        "days": days, "events": columns})
+    days, columns = month_payload(load_events(start_date, end_date, filters, since) if changed else [])
+    removed = sorted(gid for gid in changed - set(columns["gid"]) if gid)
+    return jsonify({"year": year, "month": month, "version": version, "full": False, "since": since,
+                    "days": days, "events": columns, "removed": removed})
+
+@app.route("/api/event/<gid>")
+@conditional_get
+def event_detail_api(gid):
+    """Full details of one event, fetched by the modal and tooltip when opened."""
+    version = g.data_version if "data_version" in g else get_data_version()[0]
+    detail = event_detail(gid, version)
+    if not detail:
+        return jsonify({"error": "Event not found"}), 404
+    return jsonify(detail)
+
+@app.route("/api/facets")
+@conditional_get
+def facets_api():
+    """Event counts per ministry/location/status/website trigger for a date range (default: this month)."""
+    try:
+        today = date.today()
+        default_start, default_end = month_range(today.year, today.month)
+        start_date = datetime.strptime(request.args.get("start", default_start.isoformat()), "%Y-%m-%d").date()
+        end_date = datetime.strptime(request.args.get("end", default_end.isoformat()), "%Y-%m-%d").date()
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+    facets = count_event_facets(start_date, end_date, event_filters_from_request())
+    return jsonify({"start": start_date.isoformat(), "end": end_date.isoformat(), "facets": facets})
+
 @app.route("/")
+@conditional_get
 def index():
     today = date.today()
     year = today.year
     month = today.month
     cal = calendar.Calendar(firstweekday=6)
     month_days = cal.monthdatescalendar(year, month)
-    events = load_events()
+    filters = event_filters_from_request()
+    # Today always falls in the displayed month, so one month query covers both.
+    events = load_events(*month_range(year, month), filters)
     events_by_day = {}
     for ev in events:
         try:
             ev_date = datetime.strptime(ev["start_date"], "%Y-%m-%d").date()
         except ValueError:
             continue
-        if ev_date.year == year and ev_date.month == month:
-            events_by_day.setdefault(ev_date.day, []).append(ev)
+        events_by_day.setdefault(ev_date.day, []).append(ev)
     today_events = []
     for ev in events:
         try:
@@ -885,20 +3553,20 @@ def index():
                            events=today_events,
                            display_date=display_date,
                            display_date_iso=display_date_iso,
+                           filter_query=urlencode(filters, doseq=True),
                            default_view="calendar")
 
 @app.route("/calendar.ics")
+@conditional_get
 def download_ics():
-    current_year = date.today().year
-    events = load_events()
-    current_year_events = []
-    for event in events:
-        try:
-            event_date = datetime.strptime(event["start_date"], "%Y-%m-%d").date()
-            if event_date.year == current_year:
-                current_year_events.append(event)
-        except Exception:
-            continue
+    try:
+        current_year = int(request.args.get("year", date.today().year))
+        start_date, end_date = year_range(current_year)
+    except ValueError:
+        return jsonify({"error": "Invalid year"}), 400
+    # Past years may be archived; ?year= still serves them.
+    current_year_events = load_events(start_date, end_date, event_filters_from_request(),
+                                      include_archive=current_year < date.today().year)
     ics_content = generate_ics(current_year_events)
     response = app.response_class(ics_content, mimetype='text/calendar')
     response.headers["Content-Disposition"] = f"attachment; filename=calendar_{current_year}.ics"
@@ -942,17 +3610,16 @@ def generate_ics(events):
     return "\r\n".join(lines)
 
 @app.route("/calendar.xml")
+@conditional_get
 def download_xml():
-    current_year = date.today().year
-    events = load_events()
-    current_year_events = []
-    for event in events:
-        try:
-            event_date = datetime.strptime(event["start_date"], "%Y-%m-%d").date()
-            if event_date.year == current_year:
-                current_year_events.append(event)
-        except Exception:
-            continue
+    try:
+        current_year = int(request.args.get("year", date.today().year))
+        start_date, end_date = year_range(current_year)
+    except ValueError:
+        return jsonify({"error": "Invalid year"}), 400
+    # Past years may be archived; ?year= still serves them.
+    current_year_events = load_events(start_date, end_date, event_filters_from_request(),
+                                      include_archive=current_year < date.today().year)
     xml_content = generate_xml(current_year_events)
     response = app.response_class(xml_content, mimetype='application/xml')
     response.headers["Content-Disposition"] = f"attachment; filename=calendar_{current_year}.xml"
@@ -993,6 +3660,7 @@ def generate_xml(events):
     return "\n".join(lines)
 
 @app.route('/<view>')
+@conditional_get
 def spa(view):
     if view not in ['modern_row', 'modern_list', 'calendar']:
         view = 'calendar'
@@ -1001,15 +3669,16 @@ def spa(view):
     month = today.month
     cal = calendar.Calendar(firstweekday=6)
     month_days = cal.monthdatescalendar(year, month)
-    events = load_events()
+    filters = event_filters_from_request()
+    # Today always falls in the displayed month, so one month query covers both.
+    events = load_events(*month_range(year, month), filters)
     events_by_day = {}
     for ev in events:
         try:
             ev_date = datetime.strptime(ev["start_date"], "%Y-%m-%d").date()
         except ValueError:
             continue
-        if ev_date.year == year and ev_date.month == month:
-            events_by_day.setdefault(ev_date.day, []).append(ev)
+        events_by_day.setdefault(ev_date.day, []).append(ev)
     today_events = []
     for ev in events:
         try:
@@ -1030,17 +3699,23 @@ def spa(view):
                            events=today_events,
                            display_date=display_date,
                            display_date_iso=display_date_iso,
+                           filter_query=urlencode(filters, doseq=True),
                            default_view=view)
 
 @app.route("/trigger-asana")
 def trigger_asana():
-    process_asana_tasks()
-    return "Asana tasks processed"
+    return job_accepted(enqueue_job("asana_sync"))
 
 def start_asana_scheduler():
+    global _scheduler
+    # With webhooks delivering changes, the poll only needs to catch missed deliveries.
+    interval = ASANA_RECONCILE_SECONDS if asana_webhooks_active() else ASANA_POLL_SECONDS
     scheduler = BackgroundScheduler()
-    scheduler.add_job(process_asana_tasks, 'interval', seconds=60, max_instances=1)
+    scheduler.add_job(process_asana_tasks, 'interval', seconds=interval, max_instances=1, id="asana_sync")
+    scheduler.add_job(prune_event_tombstones, 'interval', days=1, id="prune_tombstones")
+    scheduler.add_job(create_upcoming_partitions, 'interval', days=1, id="event_partitions")
     scheduler.start()
+    _scheduler = scheduler
 
 
 # Ensure you’re using Pillow 10+:
@@ -1066,53 +3741,39 @@ def compress_image(image_bytes):
         print(f"Error compressing image: {e}")
         return None
 
+def compress_stored_images(log=print, progress=None):
+    """Recompress every stored event image to JPEG, one row at a time."""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT asana_task_gid FROM events WHERE image_data IS NOT NULL")
+    gids = [row[0] for row in cur.fetchall()]
+    counts = {"compressed": 0, "failed": 0}
+    for index, uid in enumerate(gids, 1):
+        cur.execute("SELECT image_data FROM events WHERE asana_task_gid = %s AND image_data IS NOT NULL", (uid,))
+        row = cur.fetchone()
+        if not row:
+            continue
+        # Get raw bytes (if stored as psycopg2.Binary, use .tobytes())
+        raw_data = row[0].tobytes() if hasattr(row[0], "tobytes") else row[0]
+        new_img = compress_image(raw_data)
+        if new_img:
+            cur.execute("UPDATE events SET image_data = %s, image_format = 'JPEG' WHERE asana_task_gid = %s;",
+                        (psycopg2.Binary(new_img), uid))
+            conn.commit()
+            counts["compressed"] += 1
+            log(f"{uid}: {len(raw_data)} -> {len(new_img)} bytes")
+        else:
+            counts["failed"] += 1
+            log(f"{uid}: {len(raw_data)} bytes, compression failed")
+        if progress:
+            progress(f"{index}/{len(gids)} images")
+    cur.close()
+    conn.close()
+    return counts
+
 @app.route("/compress_images")
 def compress_images_route():
-    def generate():
-        conn = get_db_connection()
-        cur = conn.cursor()
-        # Select events that have non-null image_data
-        cur.execute("SELECT asana_task_gid, image_data FROM events WHERE image_data IS NOT NULL;")
-        rows = cur.fetchall()
-        
-        # Start streaming the HTML output
-        yield "<html><head><title>Image Compression Log</title>"
-        yield """
-        <style>
-          body { font-family: sans-serif; }
-          table { width: 100%; border-collapse: collapse; }
-          th, td { border: 1px solid #ccc; padding: 8px; text-align: left; }
-          th { background-color: #eee; }
-        </style>
-        """
-        yield "</head><body>"
-        yield "<h2>Image Compression Log</h2>"
-        yield "<table><tr><th>Event ID</th><th>Current Size (bytes)</th><th>New Size (bytes)</th><th>Log</th></tr>"
-        
-        for uid, image_data in rows:
-            if not image_data:
-                continue
-            # Get raw bytes (if stored as psycopg2.Binary, use .tobytes())
-            raw_data = image_data.tobytes() if hasattr(image_data, "tobytes") else image_data
-            current_size = len(raw_data)
-            new_img = compress_image(raw_data)
-            if new_img:
-                new_size = len(new_img)
-                cur.execute("UPDATE events SET image_data = %s WHERE asana_task_gid = %s;", 
-                            (psycopg2.Binary(new_img), uid))
-                conn.commit()
-                log_msg = "Success"
-            else:
-                new_size = 0
-                log_msg = "Failed"
-            row_html = f"<tr><td>{uid}</td><td>{current_size}</td><td>{new_size}</td><td>{log_msg}</td></tr>"
-            yield row_html
-            # Force auto-scroll
-            yield "<script>window.scrollTo(0, document.body.scrollHeight);</script>"
-        yield "</table><h3>Compression complete</h3></body></html>"
-        cur.close()
-        conn.close()
-    return Response(generate(), mimetype="text/html")
+    return job_accepted(enqueue_job("compress_images"))
 
 @app.route("/delete_all_events", methods=["GET"])
 def delete_all_events_route():
@@ -1180,8 +3841,480 @@ def delete_all_events_route():
         </html>
     '''
 
+# --------------------------
+# Background Jobs
+# --------------------------
+# Heavy admin operations run in `flask worker` processes instead of web requests.
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_SECONDS = int(os.getenv("JOB_RETRY_SECONDS", "30"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "5"))
+# A running job whose worker stopped heartbeating for this long is handed to another worker.
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "300"))
+JOB_LOG_MAX_CHARS = int(os.getenv("JOB_LOG_MAX_CHARS", "200000"))
+
+def enqueue_job(kind, args=None, max_attempts=JOB_MAX_ATTEMPTS):
+    """
+    Queue a job and return its id. If an identical job (same kind and args) is
+    already queued or running, that job's id is returned instead.
+    """
+    args = args or {}
+    encoded = json.dumps(args, sort_keys=True)
+    dedupe_key = f"{kind}:{hashlib.sha1(encoded.encode('utf-8')).hexdigest()}"
+    conn = get_db_connection()
+    cur = conn.cursor()
+    # DO UPDATE (a no-op) rather than DO NOTHING so RETURNING always yields the live job's
+    # id, even when it finished between a conflict and a follow-up SELECT.
+    cur.execute("""
+        INSERT INTO jobs (kind, args, dedupe_key, max_attempts) VALUES (%s, %s, %s, %s)
+        ON CONFLICT (dedupe_key) WHERE status IN ('queued', 'running') DO UPDATE SET id = jobs.id
+        RETURNING id
+    """, (kind, encoded, dedupe_key, max_attempts))
+    row = cur.fetchone()
+    conn.commit()
+    cur.close()
+    conn.close()
+    print(f"[DEBUG] Job {row[0]} ({kind}) queued")
+    return row[0]
+
+def job_accepted(job_id):
+    """202 response pointing the caller at the job's status."""
+    return jsonify({"job_id": job_id, "status_url": url_for("job_status", job_id=job_id)}), 202
+
+def claim_job():
+    """Take the oldest runnable job, or None. Concurrent workers never claim the same row."""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = now(), heartbeat_at = now()
+        WHERE id = (
+            SELECT id FROM jobs WHERE status = 'queued' AND run_after <= now()
+            ORDER BY run_after, id
+            FOR UPDATE SKIP LOCKED
+            LIMIT 1
+        )
+        RETURNING id, kind, args, attempts, max_attempts
+    """)
+    job = cur.fetchone()
+    conn.commit()
+    cur.close()
+    conn.close()
+    return job
+
+def requeue_stale_jobs():
+    """
+    Return jobs whose worker died mid-run to the queue, or fail them once they
+    have used up their attempts so a job that kills its worker can't loop forever.
+    """
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        UPDATE jobs SET status = 'failed', error = 'Worker lost', finished_at = now(),
+                        log = log || 'Worker lost, no attempts left' || E'\n'
+        WHERE status = 'running' AND heartbeat_at < now() - %s * interval '1 second'
+          AND attempts >= max_attempts
+    """, (JOB_STALE_SECONDS,))
+    cur.execute("""
+        UPDATE jobs SET status = 'queued', log = log || 'Worker lost, requeued' || E'\n'
+        WHERE status = 'running' AND heartbeat_at < now() - %s * interval '1 second'
+    """, (JOB_STALE_SECONDS,))
+    conn.commit()
+    cur.close()
+    conn.close()
+
+def finish_job(job_id, result=None, error=None, attempts=0, max_attempts=0):
+    """
+    Record a job's outcome. A failure with attempts left goes back to the queue
+    after an exponential backoff.
+    """
+    conn = get_db_connection()
+    cur = conn.cursor()
+    if error is None:
+        cur.execute("""
+            UPDATE jobs SET status = 'succeeded', result = %s, error = NULL, finished_at = now() WHERE id = %s
+        """, (json.dumps(result), job_id))
+    elif attempts < max_attempts:
+        delay = JOB_RETRY_SECONDS * 2 ** (attempts - 1)
+        cur.execute("""
+            UPDATE jobs SET status = 'queued', error = %s, run_after = now() + %s * interval '1 second'
+            WHERE id = %s
+        """, (error, delay, job_id))
+    else:
+        cur.execute("UPDATE jobs SET status = 'failed', error = %s, finished_at = now() WHERE id = %s",
+                    (error, job_id))
+    conn.commit()
+    cur.close()
+    conn.close()
+
+def get_job(job_id):
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT id, kind, args, status, attempts, max_attempts, progress, log, result, error,
+               created_at, started_at, finished_at, run_after
+        FROM jobs WHERE id = %s
+    """, (job_id,))
+    row = cur.fetchone()
+    cur.close()
+    conn.close()
+    if not row:
+        return None
+    job = dict(zip(("id", "kind", "args", "status", "attempts", "max_attempts", "progress", "log", "result",
+                    "error", "created_at", "started_at", "finished_at", "run_after"), row))
+    for key in ("created_at", "started_at", "finished_at", "run_after"):
+        job[key] = job[key].isoformat() if job[key] else None
+    return job
+
+class JobReporter:
+    """
+    Collects a running job's log lines and progress, flushing them to its row
+    (which doubles as the heartbeat) every JOB_HEARTBEAT_SECONDS. Callable as
+    `log(message)` and usable as stdout, so the job's print() output lands in
+    its log too.
+    """
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.lines = []
+        self.progress = None
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._heartbeat, daemon=True)
+        self.thread.start()
+
+    def __call__(self, message):
+        with self.lock:
+            self.lines.append(str(message))
+
+    def set_progress(self, progress):
+        with self.lock:
+            self.progress = progress
+
+    def write(self, text):
+        for line in text.splitlines():
+            if line.strip():
+                self(line)
+
+    def flush(self):
+        with self.lock:
+            lines, self.lines = self.lines, []
+            progress = self.progress
+        try:
+            conn = get_db_connection()
+            cur = conn.cursor()
+            cur.execute("""
+                UPDATE jobs SET log = right(log || %s, %s), progress = coalesce(%s, progress), heartbeat_at = now()
+                WHERE id = %s
+            """, ("".join(line + "\n" for line in lines), JOB_LOG_MAX_CHARS, progress, self.job_id))
+            conn.commit()
+            cur.close()
+            conn.close()
+        except psycopg2.Error as e:
+            sys.__stdout__.write(f"[DEBUG] Could not save log of job {self.job_id}: {e}\n")
+            with self.lock:
+                self.lines[:0] = lines
+
+    def _heartbeat(self):
+        while not self.stopped.wait(JOB_HEARTBEAT_SECONDS):
+            self.flush()
+
+    def close(self):
+        self.stopped.set()
+        self.thread.join()
+        self.flush()
+
+def asana_sync_job(args, report):
+    stats = run_asana(run_asana_projects())
+    report(f"Asana sync complete: {stats}")
+    failed = [gid for gid, result in stats.items() if "error" in result]
+    if failed:
+        raise RuntimeError(f"Asana sync failed for project(s) {', '.join(failed)}")
+    return stats
+
+def import_ics_job(args, report):
+    return import_ics_feed(args["url"], report)
+
+def compress_images_job(args, report):
+    return compress_stored_images(report, report.set_progress)
+
+JOB_HANDLERS = {
+    "asana_sync": asana_sync_job,
+    "import_ics": import_ics_job,
+    "compress_images": compress_images_job,
+}
+
+def run_job(job):
+    job_id, kind, args, attempts, max_attempts = job
+    print(f"[DEBUG] Running job {job_id} ({kind}), attempt {attempts}/{max_attempts}")
+    report = JobReporter(job_id)
+    try:
+        handler = JOB_HANDLERS.get(kind)
+        if handler is None:
+            raise ValueError(f"Unknown job kind '{kind}'")
+        with contextlib.redirect_stdout(report):
+            result = handler(args, report)
+    except Exception as e:
+        report(f"Error: {e}")
+        report.close()
+        # Unknown kinds will never succeed, so don't retry them
+        finish_job(job_id, error=str(e), attempts=attempts,
+                   max_attempts=max_attempts if kind in JOB_HANDLERS else attempts)
+        print(f"[DEBUG] Job {job_id} failed: {e}")
+    else:
+        report.close()
+        finish_job(job_id, result)
+        print(f"[DEBUG] Job {job_id} succeeded")
+
+@app.route("/jobs/<int:job_id>")
+def job_status(job_id):
+    """Status, progress, log and result of a background job."""
+    job = get_job(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+@app.cli.command("worker")
+@click.option("--once", is_flag=True, help="Exit when the queue is empty.")
+def worker_command(once):
+    """Run queued background jobs until stopped."""
+    print("[DEBUG] Job worker started")
+    while True:
+        requeue_stale_jobs()
+        job = claim_job()
+        if job:
+            run_job(job)
+        elif once:
+            break
+        else:
+            time.sleep(JOB_POLL_SECONDS)
+
+# --------------------------
+# Static export
+# --------------------------
+EXPORT_MONTHS_BACK = int(os.getenv("EXPORT_MONTHS_BACK", "1"))
+EXPORT_MONTHS_AHEAD = int(os.getenv("EXPORT_MONTHS_AHEAD", "6"))
+EXPORT_MANIFEST = ".export-manifest.json"
+
+@app.context_processor
+def inject_static_export():
+    # Exported pages fetch pre-rendered files instead of query-string API URLs.
+    return {"static_export": g.get("static_export", False)}
+
+def export_fingerprints():
+    """
+    Change fingerprints for an incremental export: a digest per month of its
+    one-off events' gids and row versions, one digest over all series masters
+    (they may occur in any month), and each event's row version and image format
+    (None without an image).
+    """
+    conn = get_read_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT asana_task_gid, to_char(start_date, 'YYYY-MM'), row_version, rrule IS NOT NULL,
+               CASE WHEN image_data IS NOT NULL THEN coalesce(image_format, 'JPEG') END
+        FROM events ORDER BY asana_task_gid, row_version
+    """)
+    months = {}
+    series = hashlib.sha1()
+    events = {}
+    for gid, month, row_version, is_series, image_format in cur.fetchall():
+        digest = series if is_series else months.setdefault(month, hashlib.sha1())
+        digest.update(f"{gid}:{row_version};".encode("utf-8"))
+        if gid:
+            events[gid] = (row_version, image_format)
+    cur.close()
+    conn.close()
+    return {month: digest.hexdigest() for month, digest in months.items()}, series.hexdigest(), events
+
+def render_static(path):
+    """Body of a GET to `path`, rendered exactly as the app would serve it."""
+    with app.test_request_context(path):
+        g.static_export = True
+        response = app.full_dispatch_request()
+    if response.status_code != 200:
+        raise RuntimeError(f"{path} returned {response.status_code}")
+    response.direct_passthrough = False
+    return response.get_data()
+
+def export_targets(months_back, months_ahead):
+    """
+    Yield (file, URL, fingerprint) for everything the static site serves.
+    A file is re-rendered only when its fingerprint differs from the last export.
+    """
+    today = date.today()
+    version, _ = get_data_version()
+    month_digests, series_digest, events = export_fingerprints()
+    site = f"{APP_VERSION}:{version}:{today}"
+
+    # Pages and feeds cover everything (and today's date), so any change rebuilds them.
+    yield "index.html", "/", site
+    for view in ("calendar", "modern_list", "modern_row"):
+        yield f"{view}/index.html", f"/{view}", site
+    yield "calendar.ics", "/calendar.ics", site
+    yield "calendar.xml", "/calendar.xml", site
+
+    first = today.year * 12 + today.month - 1 - months_back
+    for index in range(first, today.year * 12 + today.month + months_ahead):
+        year, month = divmod(index, 12)
+        month += 1
+        start_date, end_date = month_range(year, month)
+        key = f"{year:04d}-{month:02d}"
+        month_input = f"{APP_VERSION}:{month_digests.get(key, '')}:{series_digest}"
+        yield f"api/month/{key}.json", f"/api/month?year={year}&month={month}", month_input
+        yield f"api/events/{key}.json", f"/api/events?start={start_date}&end={end_date}", month_input
+        yield f"api/calendar/{key}.html", f"/api/calendar?year={year}&month={month}", f"{month_input}:{today}"
+        # Empty days fall back to upcoming events, so day fragments also follow the site version.
+        day = start_date
+        while day <= end_date:
+            yield f"api/list_events/{day}.html", f"/api/list_events/{day}", f"{month_input}:{site}"
+            yield f"api/row_events/{day}.html", f"/api/row_events/{day}", f"{month_input}:{site}"
+            day += timedelta(days=1)
+
+    # Static hosts map the decoded URL path to a file, so files carry the raw gid.
+    for gid, (row_version, image_format) in events.items():
+        if "/" in gid or gid.startswith("."):
+            continue
+        quoted = quote(gid, safe="")
+        yield f"api/event/{gid}.json", f"/api/event/{quoted}", f"{APP_VERSION}:{row_version}"
+        if image_format:
+            # Named with the extension that event_image_url links to
+            yield f"event_image/{gid}{image_extension(image_format)}", f"/event_image/{quoted}", f"{row_version}"
+
+def export_static(out_dir, months_back=EXPORT_MONTHS_BACK, months_ahead=EXPORT_MONTHS_AHEAD):
+    """
+    Render the site into `out_dir` for static hosting. Files whose inputs are
+    unchanged since the previous export (per the manifest) are left alone, and
+    files the site no longer has are removed. Returns (written, skipped, removed).
+    """
+    manifest_path = os.path.join(out_dir, EXPORT_MANIFEST)
+    try:
+        with open(manifest_path) as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = {}
+    manifest = {}
+    written = skipped = 0
+    for name, url, fingerprint in export_targets(months_back, months_ahead):
+        manifest[name] = fingerprint
+        target = os.path.join(out_dir, name)
+        if previous.get(name) == fingerprint and os.path.exists(target):
+            skipped += 1
+            continue
+        body = render_static(url)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target + ".tmp", "wb") as f:
+            f.write(body)
+        os.replace(target + ".tmp", target)
+        written += 1
+
+    # Static assets are copied whenever their content differs.
+    for dirpath, _, filenames in os.walk(app.static_folder):
+        for filename in filenames:
+            source = os.path.join(dirpath, filename)
+            name = os.path.join("static", os.path.relpath(source, app.static_folder))
+            with open(source, "rb") as f:
+                body = f.read()
+            manifest[name] = hashlib.sha1(body).hexdigest()
+            target = os.path.join(out_dir, name)
+            if previous.get(name) == manifest[name] and os.path.exists(target):
+                skipped += 1
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "wb") as f:
+                f.write(body)
+            written += 1
+
+    removed = 0
+    for name in set(previous) - set(manifest):
+        try:
+            os.remove(os.path.join(out_dir, name))
+            removed += 1
+        except FileNotFoundError:
+            pass
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=0, sort_keys=True)
+    return written, skipped, removed
+
+@app.cli.command("export-static")
+@click.argument("out_dir")
+@click.option("--months-back", default=EXPORT_MONTHS_BACK, show_default=True, help="Past months to export.")
+@click.option("--months-ahead", default=EXPORT_MONTHS_AHEAD, show_default=True, help="Months to export from this one on.")
+def export_static_command(out_dir, months_back, months_ahead):
+    """Render the calendar into OUT_DIR for static hosting, rebuilding only what changed."""
+    written, skipped, removed = export_static(out_dir, months_back, months_ahead)
+    print(f"Exported to {out_dir}: {written} written, {skipped} unchanged, {removed} removed.")
+
+# --------------------------
+# Seed data
+# --------------------------
+SEED_GID_PREFIX = "seed-"
+SEED_MINISTRIES = ["BTYM", "Sanctus", "BT Kids", "Women's Ministry", "Men's Ministry", "Global Missions"]
+SEED_LOCATIONS = ["Main Sanctuary", "Chapel", "Room 201", "Fellowship Hall", "Online"]
+
+def seed_image(rng):
+    """A small solid-colour JPEG standing in for an event flyer."""
+    color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+    output_io = BytesIO()
+    Image.new("RGB", (800, 450), color).save(output_io, format="JPEG", quality=JPEG_QUALITY)
+    return output_io.getvalue()
+
+def seed_events(count, months, image_share, rng):
+    """Synthetic events spread over `months` months around today, in insert batches."""
+    today = date.today()
+    first_day = today - timedelta(days=months * 15)
+    batch = []
+    for i in range(count):
+        start_date = first_day + timedelta(days=rng.randrange(months * 30))
+        start_hour = rng.choice([9, 10, 11, 13, 18, 19])
+        event = {
+            "asana_task_gid": f"{SEED_GID_PREFIX}{i}",
+            "event_status": rng.choice(["Approved", "Approved", "Pending"]),
+            "ministry": rng.choice(SEED_MINISTRIES),
+            "organizer": rng.choice(SEED_MINISTRIES),
+            # The values Asana sync writes; "Unpublish" gets the cancellation treatment below
+            "website_trigger": rng.choice(["Publish", "Publish", "Publish", "Unpublish"]),
+            "registration": rng.choice(["", "https://example.org/register"]),
+            "title": f"{rng.choice(['Prayer', 'Bible Study', 'Youth Night', 'Choir Rehearsal', 'Outreach'])} #{i}",
+            "start_date": start_date,
+            "start_time": f"{start_hour:02d}:00",
+            "end_date": start_date,
+            "end_time": f"{start_hour + 2:02d}:00",
+            "location": rng.choice(SEED_LOCATIONS),
+            "description": "<p>" + " ".join(rng.choice(["Join", "us", "for", "worship", "and", "fellowship"])
+                                              for _ in range(rng.randrange(20, 200))) + "</p>",
+            "image": "",
+            "image_url": ""
+        }
+        if rng.random() < image_share:
+            event["image_data"] = seed_image(rng)
+            event["image_format"] = "JPEG"
+        batch.append(adjust_for_cancellation(event))
+        if len(batch) == 500:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+@app.cli.command("seed-events")
+@click.option("--count", default=2000, show_default=True, help="Events to create.")
+@click.option("--months", default=12, show_default=True, help="Months (centred on today) to spread them over.")
+@click.option("--image-share", default=0.3, show_default=True, help="Fraction of events given an image.")
+@click.option("--seed", default=1, show_default=True, help="Random seed, for repeatable data sets.")
+def seed_events_command(count, months, image_share, seed):
+    """Replace the synthetic (seed-*) events with a fresh set, e.g. for load tests."""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("DELETE FROM events WHERE asana_task_gid LIKE %s", (SEED_GID_PREFIX + "%",))
+    print(f"Removed {cur.rowcount} previous seed events.")
+    conn.commit()
+    cur.close()
+    conn.close()
+    added = 0
+    for batch in seed_events(count, months, image_share, random.Random(seed)):
+        added += add_events(batch)
+    print(f"Seeded {added} events.")
+
 if __name__ == "__main__":
     init_db()
-    if os.getenv('ASANA_TOKEN') and os.getenv('ASANA_DEMO_PROJECT_ID'):
+    if os.getenv('ASANA_TOKEN') and load_asana_projects():
         start_asana_scheduler()
     app.run(debug=True, threaded=False)
\ No newline at end of file
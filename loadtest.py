@@ -0,0 +1,215 @@
+"""
+End-to-end load generator for the calendar.
+
+Simulates concurrent visitors against a running instance (or starts gunicorn
+itself with --serve) using a realistic mix of page loads, month navigation,
+list/row day clicks, image thumbnails and .ics polls, then reports throughput
+and p50/p95/p99 latency and error rate per endpoint.
+
+Typical run against a seeded local database:
+
+    flask --app app init-db
+    flask --app app seed-events --count 3000
+    python loadtest.py --serve --workers 4 --concurrency 50 --duration 60
+"""
+import argparse
+import asyncio
+import math
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+import httpx
+
+# (endpoint label, weight): how often a virtual visitor does each thing.
+SCENARIO_WEIGHTS = [
+    ("index", 10),
+    ("calendar_month", 30),
+    ("month_json", 10),
+    ("list_day", 12),
+    ("row_day", 8),
+    ("event_detail", 10),
+    ("event_image", 15),
+    ("ics_poll", 5),
+]
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100.0 * len(sorted_values)) - 1, 0)
+    return sorted_values[rank]
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.not_modified = defaultdict(int)
+
+    def record(self, label, seconds, status):
+        self.latencies[label].append(seconds)
+        if status is None or status >= 400:
+            self.errors[label] += 1
+        elif status == 304:
+            self.not_modified[label] += 1
+
+    def report(self, elapsed):
+        total = sum(len(values) for values in self.latencies.values())
+        total_errors = sum(self.errors.values())
+        print(f"\n{total} requests in {elapsed:.1f}s: {total / elapsed:.1f} req/s, "
+              f"{total_errors} errors ({100.0 * total_errors / max(total, 1):.2f}%)\n")
+        print(f"{'endpoint':<16}{'count':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+              f"{'max ms':>9}{'304':>7}{'err %':>8}")
+        for label in sorted(self.latencies):
+            values = sorted(self.latencies[label])
+            print(f"{label:<16}{len(values):>8}{len(values) / elapsed:>9.1f}"
+                  f"{percentile(values, 50) * 1000:>9.1f}{percentile(values, 95) * 1000:>9.1f}"
+                  f"{percentile(values, 99) * 1000:>9.1f}{values[-1] * 1000:>9.1f}"
+                  f"{self.not_modified[label]:>7}{100.0 * self.errors[label] / len(values):>8.2f}")
+
+
+class Visitor:
+    """One simulated browser: remembers ETags and wanders around months near today."""
+
+    def __init__(self, client, stats, rng, gids, image_gids, use_etags):
+        self.client = client
+        self.stats = stats
+        self.rng = rng
+        self.gids = gids
+        self.image_gids = image_gids
+        self.use_etags = use_etags
+        self.etags = {}
+        today = date.today()
+        self.year, self.month = today.year, today.month
+        self.day = today
+
+    async def get(self, label, url):
+        headers = {}
+        if self.use_etags and url in self.etags:
+            headers["If-None-Match"] = self.etags[url]
+        started = time.perf_counter()
+        status = None
+        try:
+            response = await self.client.get(url, headers=headers)
+            await response.aread()
+            status = response.status_code
+            if response.headers.get("ETag"):
+                self.etags[url] = response.headers["ETag"]
+        except httpx.HTTPError:
+            pass
+        self.stats.record(label, time.perf_counter() - started, status)
+
+    def step_month(self):
+        self.month += self.rng.choice([-1, 1, 1])
+        if self.month < 1:
+            self.year, self.month = self.year - 1, 12
+        elif self.month > 12:
+            self.year, self.month = self.year + 1, 1
+        # Drift back towards the present like real visitors do
+        if abs((self.year * 12 + self.month) - (date.today().year * 12 + date.today().month)) > 3:
+            self.year, self.month = date.today().year, date.today().month
+
+    async def act(self, label):
+        if label == "index":
+            await self.get(label, "/")
+        elif label == "calendar_month":
+            self.step_month()
+            await self.get(label, f"/api/calendar?year={self.year}&month={self.month}")
+        elif label == "month_json":
+            self.step_month()
+            await self.get(label, f"/api/month?year={self.year}&month={self.month}")
+        elif label in ("list_day", "row_day"):
+            self.day += timedelta(days=self.rng.choice([-1, 1, 1]))
+            path = "list_events" if label == "list_day" else "row_events"
+            await self.get(label, f"/api/{path}/{self.day.isoformat()}")
+        elif label == "event_detail" and self.gids:
+            await self.get(label, f"/api/event/{self.rng.choice(self.gids)}")
+        elif label == "event_image" and self.image_gids:
+            await self.get(label, f"/event_image/{self.rng.choice(self.image_gids)}")
+        elif label == "ics_poll":
+            await self.get(label, "/calendar.ics")
+
+
+async def discover_events(client):
+    """Gids (and those with stored images) around today, so detail/image requests hit real rows."""
+    start = date.today() - timedelta(days=90)
+    end = date.today() + timedelta(days=180)
+    response = await client.get(f"/api/events?start={start}&end={end}")
+    response.raise_for_status()
+    events = response.json()
+    gids = sorted({ev["asana_task_gid"] for ev in events if ev.get("asana_task_gid")})
+    image_gids = sorted({ev["asana_task_gid"] for ev in events if ev.get("image_data")})
+    return gids, image_gids
+
+
+async def run(args):
+    stats = Stats()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        gids, image_gids = await discover_events(client)
+        print(f"Found {len(gids)} events ({len(image_gids)} with images); "
+              f"{args.concurrency} visitors for {args.duration}s")
+        labels = [label for label, _ in SCENARIO_WEIGHTS]
+        weights = [weight for _, weight in SCENARIO_WEIGHTS]
+        deadline = time.perf_counter() + args.duration
+
+        async def visitor_loop(number):
+            rng = random.Random(args.seed + number)
+            visitor = Visitor(client, stats, rng, gids, image_gids, not args.no_etags)
+            while time.perf_counter() < deadline:
+                await visitor.act(rng.choices(labels, weights)[0])
+                if args.think_time:
+                    await asyncio.sleep(rng.expovariate(1.0 / args.think_time))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(visitor_loop(i) for i in range(args.concurrency)))
+        stats.report(time.perf_counter() - started)
+    return stats
+
+
+def start_server(args):
+    """Start gunicorn on the --base-url port and wait until it answers."""
+    bind = args.base_url.split("://", 1)[-1].rstrip("/")
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "app:app", "--workers", str(args.workers),
+                               "--threads", str(args.threads), "--bind", bind])
+    for _ in range(100):
+        try:
+            httpx.get(args.base_url + "/api/facets", timeout=1)
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.terminate()
+    raise SystemExit("gunicorn did not come up")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=20, help="simultaneous visitors")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to run")
+    parser.add_argument("--think-time", type=float, default=0.0,
+                        help="mean pause between a visitor's requests, in seconds (0 = closed loop)")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-etags", action="store_true", help="never revalidate; always full responses")
+    parser.add_argument("--serve", action="store_true", help="start gunicorn for the duration of the test")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers with --serve")
+    parser.add_argument("--threads", type=int, default=1, help="gunicorn threads per worker with --serve")
+    args = parser.parse_args()
+
+    server = start_server(args) if args.serve else None
+    try:
+        asyncio.run(run(args))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
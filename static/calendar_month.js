@@ -0,0 +1,133 @@
+(function() {
+  // Months already fetched from /api/month, keyed by "year-month?filters".
+  // Revisits only ask for what changed since the cached version.
+  const monthCache = {};
+  const dayNames = ["SUN", "MON", "TUE", "WED", "THU", "FRI", "SAT"];
+  const shortDays = ["Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat"];
+  const shortMonths = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"];
+
+  function escapeHtml(value) {
+    return String(value == null ? "" : value)
+      .replace(/&/g, "&amp;").replace(/</g, "&lt;").replace(/>/g, "&gt;")
+      .replace(/"/g, "&quot;").replace(/'/g, "&#39;");
+  }
+
+  // "HH:MM" -> "7:30pm", matching the server-rendered fragment
+  function formatTime(time) {
+    const parts = (time || "").split(":");
+    let hours = parseInt(parts[0], 10) || 0;
+    const minutes = parts[1] || "00";
+    const suffix = hours >= 12 ? "pm" : "am";
+    hours = hours % 12;
+    if (hours === 0) hours = 12;
+    return hours + ":" + minutes + suffix;
+  }
+
+  // Turn the columnar event lists into a gid -> event map
+  function decodeEvents(columns) {
+    const events = {};
+    columns.gid.forEach(function(gid, i) {
+      const ev = { gid: gid };
+      Object.keys(columns).forEach(function(field) {
+        ev[field] = columns[field][i];
+      });
+      events[gid] = ev;
+    });
+    return events;
+  }
+
+  function applyDelta(entry, delta) {
+    const dropped = new Set(delta.removed.concat(delta.events.gid));
+    Object.keys(entry.days).forEach(function(day) {
+      entry.days[day] = entry.days[day].filter(function(gid) { return !dropped.has(gid); });
+    });
+    delta.removed.forEach(function(gid) { delete entry.events[gid]; });
+    Object.assign(entry.events, decodeEvents(delta.events));
+    Object.keys(delta.days).forEach(function(day) {
+      entry.days[day] = (entry.days[day] || []).concat(delta.days[day]);
+      entry.days[day].sort(function(a, b) {
+        return entry.events[a].start_time.localeCompare(entry.events[b].start_time);
+      });
+    });
+    entry.version = delta.version;
+  }
+
+  function renderEvent(ev, year, month, day) {
+    const dateStr = year + "-" + String(month).padStart(2, "0") + "-" + String(day).padStart(2, "0");
+    const when = new Date(year, month - 1, day);
+    const timeStr = formatTime(ev.start_time);
+    let image = "";
+    if (ev.image_src) {
+      image = '<div class="tooltip-image-bg"><img src="' + escapeHtml(ev.image_src) +
+              '" alt="Event Image" class="tooltip-image"></div>';
+    } else if (ev.image) {
+      image = '<div class="tooltip-image-bg"><img src="' + escapeHtml(ev.image) +
+              '" alt="Event Image" class="tooltip-image"></div>';
+    }
+    return '<div class="event-container clickable-event" onclick="openEventModal(this)"' +
+      ' data-gid="' + escapeHtml(ev.gid) + '"' +
+      ' data-title="' + escapeHtml(ev.title) + '"' +
+      ' data-date="' + dateStr + '"' +
+      ' data-time="' + escapeHtml(ev.start_time) + '">' +
+      '<div class="event-item"><strong>' + timeStr + '</strong> ' + escapeHtml(ev.title) + '</div>' +
+      '<div class="event-tooltip">' + image +
+      '<div class="tooltip-title">' + escapeHtml(ev.title) + '</div>' +
+      '<div class="tooltip-datetime">' + shortDays[when.getDay()] + ", " + shortMonths[month - 1] + " " +
+      String(day).padStart(2, "0") + " @ " + timeStr + '</div>' +
+      '<div class="tooltip-description"></div>' +
+      '</div></div>';
+  }
+
+  // Same markup as calendar_fragment.html: Sunday-first weeks padded with the neighbouring months
+  function renderMonth(entry, year, month) {
+    const first = new Date(year, month - 1, 1);
+    const cursor = new Date(year, month - 1, 1 - first.getDay());
+    const today = new Date();
+    let html = '<table class="calendar-table"><thead><tr>' +
+      dayNames.map(function(name) { return "<th>" + name + "</th>"; }).join("") +
+      "</tr></thead><tbody>";
+    do {
+      html += "<tr>";
+      for (let i = 0; i < 7; i++) {
+        const inMonth = cursor.getMonth() === month - 1;
+        const isToday = cursor.toDateString() === today.toDateString();
+        html += '<td class="' + (inMonth ? "" : "other-month") + '">' +
+          '<div class="day-number ' + (isToday ? "today" : "") + '">' + cursor.getDate() + "</div>";
+        if (inMonth) {
+          (entry.days[cursor.getDate()] || []).forEach(function(gid) {
+            html += renderEvent(entry.events[gid], year, month, cursor.getDate());
+          });
+        }
+        html += "</td>";
+        cursor.setDate(cursor.getDate() + 1);
+      }
+      html += "</tr>";
+    } while (cursor.getMonth() === month - 1);
+    return html + "</tbody></table>";
+  }
+
+  function loadMonth(year, month, filterQuery) {
+    const key = year + "-" + month + "?" + (filterQuery || "");
+    const cached = monthCache[key];
+    let url;
+    if (window.STATIC_EXPORT) {
+      // Static snapshots hold one complete, unfiltered file per month
+      url = "/api/month/" + year + "-" + String(month).padStart(2, "0") + ".json";
+    } else {
+      url = "/api/month?year=" + year + "&month=" + month + (filterQuery ? "&" + filterQuery : "");
+      if (cached) url += "&since=" + cached.version;
+    }
+    return fetch(url)
+      .then(response => response.json())
+      .then(data => {
+        if (data.full || !cached) {
+          monthCache[key] = { version: data.version, days: data.days, events: decodeEvents(data.events) };
+        } else {
+          applyDelta(cached, data);
+        }
+        return renderMonth(monthCache[key], year, month);
+      });
+  }
+
+  window.loadMonth = loadMonth;
+})();
@@ -13,19 +13,69 @@
     return tempDiv.innerHTML;
   }
 
+  // Event details are fetched from /api/event/<gid> on first open or hover and kept for the page's lifetime
+  const detailCache = {};
+
+  function fetchEventDetail(gid) {
+    if (!detailCache[gid]) {
+      detailCache[gid] = fetch('/api/event/' + encodeURIComponent(gid) + (window.STATIC_EXPORT ? '.json' : ''))
+        .then(response => {
+          if (!response.ok) throw new Error("Event detail request failed: " + response.status);
+          return response.json();
+        })
+        .catch(err => {
+          delete detailCache[gid];
+          throw err;
+        });
+    }
+    return detailCache[gid];
+  }
+
   function openEventModalImpl(el) {
     const overlay = document.getElementById('eventModalOverlay');
     if (!overlay) return;
-  
-    // Retrieve data attributes from the clicked element
-    const title = el.getAttribute('data-title') || "Event Title";
-    const date = el.getAttribute('data-date') || "";
-    const time = el.getAttribute('data-time') || "";
-    const location = el.getAttribute('data-location') || "Location not provided";
-    const organizer = el.getAttribute('data-organizer') || "Organizer not provided";
-    const description = el.getAttribute('data-description') || "";
-    const image = el.getAttribute('data-image') || "";
-    const registration = el.getAttribute('data-registration') || "";
+
+    // Title, date and time are on the element; the rest arrives with the detail request
+    const gid = el.getAttribute('data-gid') || "";
+    const fields = {
+      title: el.getAttribute('data-title') || "Event Title",
+      date: el.getAttribute('data-date') || "",
+      time: el.getAttribute('data-time') || "",
+      location: el.getAttribute('data-location') || "",
+      organizer: el.getAttribute('data-organizer') || "",
+      description: el.getAttribute('data-description') || "",
+      image: el.getAttribute('data-image') || "",
+      registration: el.getAttribute('data-registration') || ""
+    };
+    overlay.setAttribute('data-gid', gid);
+    showEventModal(fields);
+    if (!gid) return;
+
+    fetchEventDetail(gid)
+      .then(detail => {
+        // Ignore a late answer if another event was opened in the meantime
+        if (overlay.getAttribute('data-gid') !== gid) return;
+        showEventModal(Object.assign({}, fields, {
+          location: detail.location || "",
+          organizer: detail.organizer || "",
+          description: detail.description || "",
+          image: detail.image || "",
+          registration: detail.registration || ""
+        }));
+      })
+      .catch(err => console.error("Error fetching event details:", err));
+  }
+
+  function showEventModal(fields) {
+    const overlay = document.getElementById('eventModalOverlay');
+    const title = fields.title;
+    const date = fields.date;
+    const time = fields.time;
+    const location = fields.location || "Location not provided";
+    const organizer = fields.organizer || "Organizer not provided";
+    const description = fields.description;
+    const image = fields.image;
+    const registration = fields.registration;
   
     // Debug output for image
     console.log("Event image URL:", image);
@@ -178,6 +228,22 @@
     }
   }
   
+  // Fill a calendar tooltip's description the first time it is hovered
+  function loadTooltipDescription(container) {
+    const target = container.querySelector('.tooltip-description');
+    const gid = container.getAttribute('data-gid');
+    if (!target || !gid || target.hasAttribute('data-loaded')) return;
+    target.setAttribute('data-loaded', '');
+    fetchEventDetail(gid)
+      .then(detail => {
+        target.innerHTML = cleanDescription(detail.description || "");
+      })
+      .catch(err => {
+        target.removeAttribute('data-loaded');
+        console.error("Error fetching event details:", err);
+      });
+  }
+
   document.addEventListener('DOMContentLoaded', function() {
     const closeBtn = document.getElementById('closeEventModalBtn');
     const overlay = document.getElementById('eventModalOverlay');
@@ -192,6 +258,13 @@
       });
     }
   
+    document.addEventListener('mouseover', function(e) {
+      const container = e.target.closest && e.target.closest('.event-container[data-gid]');
+      if (container) {
+        loadTooltipDescription(container);
+      }
+    });
+
     document.addEventListener('click', function(e) {
       let target = e.target;
       while (target && target !== document) {
@@ -0,0 +1,67 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as calendar_app  # noqa: E402
+
+
+class FakeCursor:
+    """Answers each execute() with the next queued result (a list of rows)."""
+
+    def __init__(self, results):
+        self.results = results
+        self.rows = []
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+        self.rows = list(self.results.pop(0)) if self.results else []
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, results):
+        self.cur = FakeCursor(list(results))
+
+    def cursor(self):
+        return self.cur
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def set_session(self, **kwargs):
+        self.session = kwargs
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """Route the app's connections to a fake whose queries return the given results in order."""
+    def install(*results):
+        conn = FakeConnection(results)
+        monkeypatch.setattr(calendar_app, "get_db_connection", lambda: conn)
+        monkeypatch.setattr(calendar_app, "get_read_connection", lambda: conn)
+        return conn.cur
+    return install
+
+
+@pytest.fixture
+def client():
+    return calendar_app.app.test_client()
@@ -0,0 +1,100 @@
+from datetime import date
+
+import pytest
+
+import app
+
+
+def item(**fields):
+    base = {"external_id": "42", "title": "Picnic", "start_date": "2025-06-01", "start_time": "12:00"}
+    base.update(fields)
+    return base
+
+
+def test_valid_item_is_namespaced_and_defaulted():
+    event, error = app.validate_bulk_event(item(image="https://example.org/a.jpg"))
+    assert error is None
+    assert event["asana_task_gid"] == "ext:42"
+    assert event["end_date"] is None and event["end_time"] is None
+    assert event["image_url"] == "https://example.org/a.jpg"
+    assert event["description"] == "" and event["location"] == ""
+
+
+def test_asana_gid_wins_and_integers_are_accepted():
+    event, error = app.validate_bulk_event(item(asana_task_gid=1234))
+    assert error is None
+    assert event["asana_task_gid"] == "1234"
+
+
+@pytest.mark.parametrize("payload, message", [
+    ("not an object", "Item must be an object"),
+    (item(colour="red"), "Unknown field(s): colour"),
+    (item(title=["Picnic"]), "Field 'title' must be a string"),
+    (item(location=5), "Field 'location' must be a string"),
+    (item(external_id=True), "Field 'external_id' must be a string or integer"),
+    (item(external_id={"id": 1}), "Field 'external_id' must be a string or integer"),
+    (item(external_id=None), "Missing field 'asana_task_gid' or 'external_id'"),
+    (item(title=""), "Missing field 'title'"),
+    (item(start_date="01/06/2025"), "Invalid start_date; use YYYY-MM-DD dates and HH:MM times"),
+    (item(end_time="noon"), "Invalid end_time; use YYYY-MM-DD dates and HH:MM times"),
+])
+def test_invalid_items(payload, message):
+    event, error = app.validate_bulk_event(payload)
+    assert event is None
+    assert error == message
+
+
+def test_null_optional_fields_are_allowed():
+    event, error = app.validate_bulk_event(item(description=None, end_date=None))
+    assert error is None
+    assert event["description"] == ""
+
+
+def test_bulk_endpoint_reports_each_item(monkeypatch, client):
+    unchanged, _ = app.validate_bulk_event(item(external_id=3))
+    monkeypatch.setattr(app, "existing_event_hashes", lambda keys: {
+        "ext:3": (app.event_content_hash(unchanged), ""), "old": ("stale", ""), "moved": ("stale", ""),
+        "ext:5": ("stale", "")})
+    archive = {"old": date(2025, 1, 5), "moved": date(2024, 6, 1)}
+    monkeypatch.setattr(app, "archived_event_gids", lambda gids: {gid: archive[gid] for gid in gids if gid in archive})
+    written = []
+
+    def upsert_event_chunk(events):
+        written.extend(event["asana_task_gid"] for event in events)
+        return {"ext:5"}
+    monkeypatch.setattr(app, "upsert_event_chunk", upsert_event_chunk)
+
+    response = client.post("/api/events/bulk", json=[
+        item(external_id=1),
+        item(external_id=3),
+        item(asana_task_gid="old"),
+        item(asana_task_gid="moved"),
+        item(external_id=5, title="Renamed"),
+        item(external_id=1),
+        item(title=7),
+    ])
+    assert response.status_code == 200
+    statuses = [(result["status"], result.get("error")) for result in response.get_json()["results"]]
+    assert statuses == [
+        ("created", None),
+        ("unchanged", None),
+        ("invalid", "Event is in an archived year"),
+        ("created", None),
+        ("updated", None),
+        ("invalid", "Duplicate key 'ext:1' (first at item 0)"),
+        ("invalid", "Field 'title' must be a string"),
+    ]
+    assert written == ["ext:1", "moved", "ext:5"]
+
+
+def test_archived_changes_only_leave_the_archive_when_needed(monkeypatch):
+    events = [
+        {"asana_task_gid": "edited", "start_date": "2023-05-01", "title": "New title"},
+        {"asana_task_gid": "moved", "start_date": "2025-05-01", "title": "Moved"},
+        {"asana_task_gid": "series", "start_date": "2023-01-02", "title": "Weekly", "rrule": "FREQ=WEEKLY"},
+    ]
+    monkeypatch.setattr(app, "existing_event_hashes", lambda gids: {gid: ("stale", "") for gid in gids})
+    monkeypatch.setattr(app, "archived_event_gids", lambda gids: {gid: date(2023, 3, 1) for gid in gids})
+    new, changed, unchanged = app.diff_events(events)
+    assert [event["asana_task_gid"] for event in new] == ["moved", "series"]
+    assert changed == [] and unchanged == 1
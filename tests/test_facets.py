@@ -0,0 +1,23 @@
+from datetime import date
+
+import app
+
+
+def test_facets_count_series_occurrences(fake_db, monkeypatch):
+    cur = fake_db([("ministry", "Youth", 2), ("status", "Approved", 2)])
+    calls = []
+
+    def expand_series(window_start, window_end, filters=None, since=None):
+        calls.append(filters)
+        weekly = {"ministry": "Choir", "location": "Hall", "event_status": "Approved", "website_trigger": "Publish"}
+        return [] if filters.get("ministry") == ["Youth"] else [dict(weekly), dict(weekly)]
+    monkeypatch.setattr(app, "expand_series", expand_series)
+
+    facets = app.count_event_facets(date(2025, 3, 1), date(2025, 3, 31), {"ministry": ["Youth"]})
+    # The ministry facet ignores its own filter, so it sees the Choir series; the others don't
+    assert facets["ministry"] == {"Youth": 2, "Choir": 2}
+    assert facets["status"] == {"Approved": 2}
+    assert facets["project"] == {}
+    # Masters are left out of the row counts and expanded once per distinct filter set
+    assert cur.executed[0][0].count("rrule IS NULL") == len(app.EVENT_FILTER_COLUMNS)
+    assert calls == [{}, {"ministry": ["Youth"]}]
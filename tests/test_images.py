@@ -0,0 +1,86 @@
+import pytest
+
+import app
+
+
+class FakeResponse:
+    def __init__(self, chunks, headers=None):
+        self.chunks = chunks
+        self.headers = headers or {}
+
+    def iter_content(self, chunk_size=None):
+        yield from self.chunks
+
+
+def test_read_capped_returns_body_within_limit():
+    resp = FakeResponse([b"abc", b"def"], {"Content-Length": "6"})
+    assert app.read_capped(resp, max_bytes=6) == b"abcdef"
+
+
+def test_read_capped_refuses_declared_oversize_before_reading():
+    resp = FakeResponse(iter(()), {"Content-Length": "11"})
+    resp.iter_content = None  # must not be reached
+    with pytest.raises(app.ImageRejected):
+        app.read_capped(resp, max_bytes=10)
+
+
+def test_read_capped_stops_undeclared_oversize_body():
+    resp = FakeResponse([b"x" * 6, b"x" * 6, b"never read"])
+    with pytest.raises(app.ImageRejected):
+        app.read_capped(resp, max_bytes=10)
+
+
+def test_read_capped_ignores_bogus_content_length():
+    resp = FakeResponse([b"abc"], {"Content-Length": "lots"})
+    assert app.read_capped(resp, max_bytes=10) == b"abc"
+
+
+@pytest.mark.parametrize("image_format, mime", [
+    ("JPEG", "image/jpeg"),
+    ("PNG", "image/png"),
+    ("png", "image/png"),
+    ("GIF", "image/gif"),
+    ("WEBP", "image/webp"),
+    (None, "image/jpeg"),
+    ("TIFF", "image/jpeg"),
+])
+def test_image_mime_type(image_format, mime):
+    assert app.image_mime_type(image_format) == mime
+
+
+def test_event_image_served_with_stored_format(fake_db, client):
+    fake_db([(b"\x89PNG...", "PNG")])
+    response = client.get("/event_image/123")
+    assert response.status_code == 200
+    assert response.mimetype == "image/png"
+    assert response.data == b"\x89PNG..."
+
+
+def test_event_image_missing(fake_db, client):
+    fake_db([])
+    assert client.get("/event_image/123").status_code == 404
+
+
+def test_event_image_url_has_extension_only_in_static_export():
+    with app.app.test_request_context("/"):
+        assert app.event_image_url("a b", "PNG") == "/event_image/a%20b"
+        app.g.static_export = True
+        assert app.event_image_url("a b", "PNG") == "/event_image/a%20b.png"
+        assert app.event_image_url("a b", None) == "/event_image/a%20b.jpg"
+
+
+def test_month_payload_links_stored_images():
+    events = [{"asana_task_gid": gid, "start_date": "2025-03-04", "title": gid, "start_time": "10:00",
+               "end_time": "11:00", "image": "", "image_data": has_image, "image_format": "GIF"}
+              for gid, has_image in (("with", True), ("without", False))]
+    with app.app.test_request_context("/"):
+        app.g.static_export = True
+        _, columns = app.month_payload(events)
+    assert columns["image_src"] == ["/event_image/with.gif", ""]
+
+
+def test_export_writes_images_with_their_extension(monkeypatch):
+    monkeypatch.setattr(app, "get_data_version", lambda: (1, None))
+    monkeypatch.setattr(app, "export_fingerprints", lambda: ({}, "", {"e1": (4, "WEBP"), "e2": (5, None)}))
+    images = [target for target in app.export_targets(0, 0) if target[0].startswith("event_image/")]
+    assert images == [("event_image/e1.webp", "/event_image/e1", "4")]
@@ -0,0 +1,100 @@
+import app
+
+
+def event(gid, day, title="Event"):
+    return {"asana_task_gid": gid, "start_date": f"2025-03-{day:02d}", "title": title,
+            "start_time": "10:00", "end_time": "11:00", "image": "", "image_data": None}
+
+
+def test_month_payload_sends_each_body_once():
+    days, columns = app.month_payload([event("a", 3), event("b", 3), event("a", 10)])
+    assert days == {"3": ["a", "b"], "10": ["a"]}
+    assert columns["gid"] == ["a", "b"]
+    assert columns["start_time"] == ["10:00", "10:00"]
+
+
+def test_changed_gids_merge_rows_and_tombstones(fake_db):
+    cur = fake_db([(5,)], [("a",), ("b",), ("a",)])
+    assert app.changed_event_gids(7) == {"a", "b"}
+    assert cur.executed[1][1] == (7, 7)
+
+
+def test_changed_gids_none_once_tombstones_pruned(fake_db):
+    fake_db([(9,)])
+    assert app.changed_event_gids(7) is None
+
+
+def test_changed_gids_at_pruned_version(fake_db):
+    fake_db([(7,)], [])
+    assert app.changed_event_gids(7) == set()
+
+
+def install_month(monkeypatch, changed, events):
+    monkeypatch.setattr(app, "get_data_version", lambda: (12, None))
+    monkeypatch.setattr(app, "changed_event_gids", lambda since: changed)
+    loaded = []
+
+    def load_events(start_date, end_date, filters=None, since=None):
+        loaded.append(since)
+        return events
+    monkeypatch.setattr(app, "load_events", load_events)
+    return loaded
+
+
+def test_month_delta_lists_removed_gids(monkeypatch, client):
+    loaded = install_month(monkeypatch, {"a", "gone", "moved"}, [event("a", 4, "Renamed")])
+    body = client.get("/api/month?year=2025&month=3&since=10").get_json()
+    assert loaded == [10]
+    assert body["full"] is False
+    assert body["version"] == 12
+    assert body["days"] == {"4": ["a"]}
+    assert body["events"]["title"] == ["Renamed"]
+    # Deleted rows and rows that left this month both come back as removed
+    assert body["removed"] == ["gone", "moved"]
+
+
+def test_month_delta_without_changes_skips_loading(monkeypatch, client):
+    loaded = install_month(monkeypatch, set(), [event("a", 4)])
+    body = client.get("/api/month?year=2025&month=3&since=12").get_json()
+    assert loaded == []
+    assert body["days"] == {} and body["removed"] == []
+
+
+def test_month_falls_back_to_full_when_since_too_old(monkeypatch, client):
+    loaded = install_month(monkeypatch, None, [event("a", 4)])
+    body = client.get("/api/month?year=2025&month=3&since=1").get_json()
+    assert loaded == [None]
+    assert body["full"] is True
+    assert "removed" not in body
+
+
+def test_month_rejects_bad_since(monkeypatch, client):
+    install_month(monkeypatch, set(), [])
+    assert client.get("/api/month?since=abc").status_code == 400
+
+
+def test_manual_events_get_their_own_keys(monkeypatch, client):
+    stored = []
+    monkeypatch.setattr(app, "add_event", lambda event: stored.append(event) or event)
+    for title in ("First", "Second"):
+        response = client.post("/api/events", json={"title": title, "start_date": "2025-03-04", "start_time": "10:00"})
+        assert response.status_code == 201
+    gids = [event["asana_task_gid"] for event in stored]
+    assert all(gid.startswith("manual-") for gid in gids) and gids[0] != gids[1]
+    days, columns = app.month_payload([dict(event(gid, 4), title=e["title"]) for gid, e in zip(gids, stored)])
+    assert columns["title"] == ["First", "Second"]
+
+
+def test_read_snapshot_shares_one_repeatable_read_connection(monkeypatch):
+    from conftest import FakeConnection
+    opened = []
+    monkeypatch.setattr(app, "open_read_connection", lambda: opened.append(FakeConnection([])) or opened[-1])
+    with app.read_snapshot():
+        first, second = app.get_read_connection(), app.get_read_connection()
+        first.close()
+        assert first is second and not hasattr(opened[0], "closed")
+    assert len(opened) == 1
+    assert opened[0].session == {"isolation_level": "REPEATABLE READ", "readonly": True}
+    assert opened[0].closed
+    app.get_read_connection()
+    assert len(opened) == 2
@@ -0,0 +1,123 @@
+from datetime import date, datetime
+
+from icalendar import Calendar
+
+import app
+
+
+def vevents(body):
+    text = "BEGIN:VCALENDAR\r\n" + body.strip().replace("\n", "\r\n") + "\r\nEND:VCALENDAR\r\n"
+    return Calendar.from_ical(text.encode("utf-8")).walk("VEVENT")
+
+
+def master(rrule, **fields):
+    event = {"asana_task_gid": "series", "content_hash": repr(sorted(fields.items())) + rrule,
+             "start_date": "2025-01-06", "start_time": "10:00", "rrule": rrule,
+             "rdates": [], "exdates": []}
+    event.update(fields)
+    return event
+
+
+def test_weekly_series_within_window():
+    starts = app.series_occurrences(master("FREQ=WEEKLY"), date(2025, 1, 1), date(2025, 1, 31))
+    assert [start.day for start in starts] == [6, 13, 20, 27]
+
+
+def test_until_is_inclusive():
+    rule = master("FREQ=WEEKLY;UNTIL=20250120T100000")
+    starts = app.series_occurrences(rule, date(2025, 1, 1), date(2025, 12, 31))
+    assert starts[-1] == datetime(2025, 1, 20, 10, 0)
+
+
+def test_exdates_and_rdates():
+    rule = master("FREQ=WEEKLY;COUNT=3", exdates=[datetime(2025, 1, 13, 10, 0)],
+                  rdates=[datetime(2025, 1, 15, 18, 0)])
+    starts = app.series_occurrences(rule, date(2025, 1, 1), date(2025, 1, 31))
+    assert starts == [datetime(2025, 1, 6, 10, 0), datetime(2025, 1, 15, 18, 0), datetime(2025, 1, 20, 10, 0)]
+
+
+def test_bad_rule_yields_no_occurrences():
+    assert app.series_occurrences(master("FREQ=SOMETIMES"), date(2025, 1, 1), date(2025, 1, 31)) == []
+
+
+def test_ics_series_master_converts_until_and_exdate():
+    (component,) = vevents("""
+BEGIN:VEVENT
+UID:standup
+SUMMARY:Standup
+DTSTART:20250106T100000
+DTEND:20250106T103000
+RRULE:FREQ=WEEKLY;UNTIL=20250127T100000
+EXDATE:20250113T100000
+END:VEVENT
+""")
+    event = app.ics_component_to_event(component)
+    assert event["asana_task_gid"] == "standup"
+    assert "UNTIL=20250127T100000" in event["rrule"]
+    assert event["exdates"] == [datetime(2025, 1, 13, 10, 0)]
+    assert event["series_until"] == date(2025, 1, 27)
+
+
+def test_ics_date_only_until_covers_whole_day():
+    (component,) = vevents("""
+BEGIN:VEVENT
+UID:standup
+DTSTART:20250106T100000
+RRULE:FREQ=WEEKLY;UNTIL=20250120
+END:VEVENT
+""")
+    event = app.ics_component_to_event(component)
+    assert event["series_until"] == date(2025, 1, 20)
+
+
+def test_ics_rdate_period_uses_period_start():
+    (component,) = vevents("""
+BEGIN:VEVENT
+UID:extra
+DTSTART:20250106T100000
+RDATE;VALUE=PERIOD:20250108T180000/20250108T200000,20250110T090000/PT1H
+END:VEVENT
+""")
+    event = app.ics_component_to_event(component)
+    assert event["rdates"] == [datetime(2025, 1, 8, 18, 0), datetime(2025, 1, 10, 9, 0)]
+
+
+def test_override_gets_own_gid_and_excludes_original_occurrence():
+    series, override = vevents("""
+BEGIN:VEVENT
+UID:standup
+DTSTART:20250106T100000
+RRULE:FREQ=WEEKLY;COUNT=4
+END:VEVENT
+BEGIN:VEVENT
+UID:standup
+RECURRENCE-ID:20250113T100000
+DTSTART:20250114T150000
+SUMMARY:Moved standup
+END:VEVENT
+""")
+    events = [app.ics_component_to_event(series), app.ics_component_to_event(override)]
+    assert events[1]["asana_task_gid"] == "standup#20250113T100000"
+    assert events[1]["recurrence_of"] == "standup"
+    stored = app.link_series_overrides(events)
+    assert datetime(2025, 1, 13, 10, 0) in stored[0]["exdates"]
+    assert stored[1]["start_date"] == "2025-01-14"
+
+
+def test_cancelled_override_is_dropped_but_still_excluded():
+    series, cancelled = vevents("""
+BEGIN:VEVENT
+UID:standup
+DTSTART:20250106T100000
+RRULE:FREQ=WEEKLY;COUNT=4
+END:VEVENT
+BEGIN:VEVENT
+UID:standup
+RECURRENCE-ID:20250113T100000
+DTSTART:20250113T100000
+STATUS:CANCELLED
+END:VEVENT
+""")
+    stored = app.link_series_overrides([app.ics_component_to_event(series), app.ics_component_to_event(cancelled)])
+    assert [event["asana_task_gid"] for event in stored] == ["standup"]
+    assert stored[0]["exdates"] == [datetime(2025, 1, 13, 10, 0)]
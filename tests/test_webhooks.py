@@ -0,0 +1,40 @@
+import json
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def webhook(monkeypatch):
+    monkeypatch.setattr(app, "load_asana_projects", lambda: {"p1": {"gid": "p1"}})
+    queued = []
+    monkeypatch.setattr(app, "queue_asana_task_changes", lambda target, changes: queued.extend(changes))
+    monkeypatch.setitem(app._webhook_secrets, "p1", "old-secret")
+    return queued
+
+
+def deliver(client, secret):
+    body = json.dumps({"events": [{"resource": {"resource_type": "task", "gid": "t1"}, "action": "changed"}]})
+    return client.post("/webhooks/asana?project=p1", data=body, content_type="application/json",
+                       headers={"X-Hook-Signature": app.sign_asana_payload(secret, body.encode("utf-8"))})
+
+
+def test_secret_rotated_by_another_worker_is_reloaded(webhook, fake_db, client):
+    fake_db([("new-secret",)])
+    response = deliver(client, "new-secret")
+    assert response.status_code == 200
+    assert webhook == [("t1", "changed")]
+    assert app._webhook_secrets["p1"] == "new-secret"
+
+
+def test_cached_secret_needs_no_query(webhook, fake_db, client):
+    cur = fake_db()
+    assert deliver(client, "old-secret").status_code == 200
+    assert cur.executed == []
+
+
+def test_bad_signature_still_rejected(webhook, fake_db, client):
+    fake_db([("new-secret",)])
+    assert deliver(client, "forged").status_code == 401
+    assert webhook == []